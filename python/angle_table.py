@@ -0,0 +1,40 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+
+# Precomputed cos/sin of every branch angle a tree can produce. Branch angles only
+# depend on how many left and right turns lead to a branch, so a tree with millions
+# of branches has a few hundred distinct angles at most. Engines carry an integer
+# index into the table instead of a float angle and never call cos/sin per branch.
+#
+# `cos` / `sin` are tuples for scalar loops, `cos_array` / `sin_array` their numpy
+# counterparts for the vectorized engines.
+class AngleTable:
+
+    def __init__(self, angles):
+        self.angles = angles
+        self.cos = tuple(math.cos(angle) for angle in angles)
+        self.sin = tuple(math.sin(angle) for angle in angles)
+        self.cos_array = np.array(self.cos, dtype=np.float64)
+        self.sin_array = np.array(self.sin, dtype=np.float64)
+        self.cos_array.flags.writeable = False
+        self.sin_array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.angles)
+
+
+@lru_cache(maxsize=64)
+def symmetric_angle_table(base_angle, branch_angle_radians, max_turns):
+    """Angles base + k * branch_angle for k in [-max_turns, max_turns], at index k + max_turns."""
+    return AngleTable(tuple(base_angle + k * branch_angle_radians
+                            for k in range(-max_turns, max_turns + 1)))
+
+
+@lru_cache(maxsize=64)
+def asymmetric_angle_table(base_angle, left_angle_rad, right_angle_rad, n_left, n_right):
+    """Angles base + a * left_angle - b * right_angle for a < n_left, b < n_right,
+    at flat index a * n_right + b."""
+    return AngleTable(tuple(base_angle + a * left_angle_rad - b * right_angle_rad
+                            for a in range(n_left) for b in range(n_right)))
@@ -1,66 +1,507 @@
 import math
 import time
 import numpy as np
-from functools import lru_cache
+from functools import lru_cache, partial
+from angle_table import asymmetric_angle_table
+from compact import generate_compact
+from culling import cull_tree, effective_min_length
+from implicit_layout import LinkedBranches
+from instancing import CanonicalCache, instance_subtree
+from streaming import REDUCTION_CHUNK_ROWS, dfs_pieces, pack_chunks, resolve_chunk_rows
+from summary import COLLECT_MODES, TreeSummary
 from utils import print_header, print_params, print_result
 
 
 def _count_asymmetric(starting_length, left_ratio, right_ratio, min_length):
-    """Count branches exactly using memoization on (left_turns, right_turns).
-    Runs in O(D_left × D_right) ≈ O(459) steps regardless of tree size."""
-    @lru_cache(maxsize=None)
-    def count(a, b):
-        if starting_length * (left_ratio ** a) * (right_ratio ** b) < min_length:
-            return 0
-        return 1 + count(a + 1, b) + count(a, b + 1)
-    return count(0, 0)
+    """Count branches exactly with a table over (left_turns, right_turns).
+    Runs in O(D_left × D_right) ≈ O(459) steps regardless of tree size, without
+    recursing, so lopsided trees deeper than the recursion limit are fine."""
+    _, counts = _lattice(starting_length, left_ratio, right_ratio, min_length)
+    return int(counts[0, 0])
+
+
+# A left turn moves one lattice row down (cell + n_right), a right turn one column over
+def _recurse(branches, idx, x, y, cell, depth, min_length, n_right, lengths, cos_t, sin_t):
+    """Write the subtree in DFS pre-order from branches[idx]; returns the next free row."""
+    length = lengths[cell]
+    if length < min_length:
+        return idx
+    end_x = x + length * cos_t[cell]
+    end_y = y + length * sin_t[cell]
+    branches[idx] = (x, y, end_x, end_y, depth)
+    idx = _recurse(branches, idx + 1, end_x, end_y, cell + n_right, depth + 1, min_length, n_right,
+                   lengths, cos_t, sin_t)
+    return _recurse(branches, idx, end_x, end_y, cell + 1, depth + 1, min_length, n_right, lengths, cos_t, sin_t)
 
 
 # Returns numpy array of shape (N, 5) with columns (x1, y1, x2, y2, depth).
 # Asymmetric variant: left and right branches use different angles and ratios.
+# If `out` is given, rows are written into it instead of a fresh array.
+# Branches carry their (left_turns, right_turns) lattice cell as a flat index into the
+# lattice lengths and a precomputed angle table, so the recursion does no trig and
+# prunes on exactly the lengths _count_asymmetric counts. With cell=(a, b), only the
+# subtree rooted at that cell of the tree with trunk `length` and base `angle` is
+# generated - as the parallel runners do - with the very same lengths and directions.
 def generate_fractal_tree_asymmetric(x, y, length, angle, left_ratio, right_ratio,
-                                     left_angle_rad, right_angle_rad, min_length, start_depth=0):
-    if length < min_length:
+                                     left_angle_rad, right_angle_rad, min_length, start_depth=0,
+                                     out=None, cell=(0, 0)):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    if lengths[cell] < min_length:
         return np.empty((0, 5), dtype=np.float64)
 
-    n_branches = _count_asymmetric(length, left_ratio, right_ratio, min_length)
-    branches = np.empty((n_branches, 5), dtype=np.float64)
+    branches = np.empty((counts[cell], 5), dtype=np.float64) if out is None else out
+    n_left, n_right = lengths.shape
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, n_left, n_right)
+    idx = _recurse(branches, 0, x, y, cell[0] * n_right + cell[1], start_depth, min_length, n_right,
+                   lengths.ravel().tolist(), table.cos, table.sin)
+    return branches[:idx]
+
+
+# Rows buffered as tuples by the iterative kernel before one slice assignment
+ROW_FLUSH = 4096
+
+
+# Iterative variant of generate_fractal_tree_asymmetric with the same DFS pre-order rows
+# and no recursion limit. Pending right children wait on a preallocated stack of
+# (x, y, cell, depth) records; a root-to-leaf path crosses at most n_left + n_right
+# lattice cells, which bounds the stack.
+def generate_fractal_tree_asymmetric_iterative(x, y, length, angle, left_ratio, right_ratio,
+                                               left_angle_rad, right_angle_rad, min_length,
+                                               start_depth=0, out=None, cell=(0, 0)):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    if lengths[cell] < min_length:
+        return np.empty((0, 5), dtype=np.float64)
+
+    branches = np.empty((counts[cell], 5), dtype=np.float64) if out is None else out
+    n_left, n_right = lengths.shape
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, n_left, n_right)
+    cos_t, sin_t = table.cos, table.sin
+    flat_lengths = lengths.ravel().tolist()
+    stack = [None] * (n_left + n_right)
+    top = 0
+    rows = []
     idx = 0
+    cell, depth = cell[0] * n_right + cell[1], start_depth
+
+    while True:
+        length = flat_lengths[cell]
+        end_x = x + length * cos_t[cell]
+        end_y = y + length * sin_t[cell]
+        rows.append((x, y, end_x, end_y, depth))
+        if flat_lengths[cell + 1] >= min_length:
+            stack[top] = (end_x, end_y, cell + 1, depth + 1)
+            top += 1
+        if flat_lengths[cell + n_right] >= min_length:
+            x, y, cell, depth = end_x, end_y, cell + n_right, depth + 1
+            continue
+        if len(rows) >= ROW_FLUSH or not top:
+            branches[idx:idx + len(rows)] = rows
+            idx += len(rows)
+            rows.clear()
+        if not top:
+            break
+        top -= 1
+        x, y, cell, depth = stack[top]
 
-    def recurse(x, y, length, angle, depth):
-        nonlocal idx
-        if length < min_length:
-            return
-        end_x = x + length * math.cos(angle)
-        end_y = y + length * math.sin(angle)
-        branches[idx] = (x, y, end_x, end_y, depth)
-        idx += 1
-        recurse(end_x, end_y, length * left_ratio,  angle + left_angle_rad,  depth + 1)
-        recurse(end_x, end_y, length * right_ratio, angle - right_angle_rad, depth + 1)
-
-    recurse(x, y, length, angle, start_depth)
     return branches[:idx]
 
 
+def _lattice_lengths(length, left_ratio, right_ratio, min_length):
+    """Branch length per (left_turns, right_turns) cell, with one extra row/column below
+    min_length so children can be indexed safely."""
+    max_left = max_right = 0
+    while length * (left_ratio ** max_left) >= min_length:
+        max_left += 1
+    while length * (right_ratio ** max_right) >= min_length:
+        max_right += 1
+    return np.array([[length * (left_ratio ** a) * (right_ratio ** b)
+                      for b in range(max_right + 1)]
+                     for a in range(max_left + 1)], dtype=np.float64)
+
+
+def _lattice_counts(lengths, min_length):
+    """Branch count of the subtree rooted at every lattice cell: 1 + left child + right child."""
+    n_left, n_right = lengths.shape
+    counts = np.zeros((n_left + 1, n_right + 1), dtype=np.int64)
+    for a in range(n_left - 1, -1, -1):
+        for b in range(n_right - 1, -1, -1):
+            if lengths[a, b] >= min_length:
+                counts[a, b] = 1 + counts[a + 1, b] + counts[a, b + 1]
+    return counts
+
+
+@lru_cache(maxsize=16)
+def _lattice(length, left_ratio, right_ratio, min_length):
+    """Lattice lengths and subtree counts of the tree with trunk `length`. Read-only, cached."""
+    lengths = _lattice_lengths(length, left_ratio, right_ratio, min_length)
+    counts = _lattice_counts(lengths, min_length)
+    lengths.flags.writeable = False
+    counts.flags.writeable = False
+    return lengths, counts
+
+
+# Nodes of the partition / streaming / culling walkers: (left_turns, right_turns) cells
+# of the tree with trunk `length`. Lengths, subtree sizes and directions are looked up
+# as in the engines, so the rows the walkers emit are bit-identical to generated ones.
+class _LatticeNodes:
+
+    def __init__(self, length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length):
+        self.lengths, self.counts = _lattice(length, left_ratio, right_ratio, min_length)
+        self.n_right = self.lengths.shape[1]
+        self.table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, *self.lengths.shape)
+
+    def subtree_size(self, cell):
+        return int(self.counts[cell])
+
+    def branch(self, cell):
+        flat = cell[0] * self.n_right + cell[1]
+        return float(self.lengths[cell]), self.table.cos[flat], self.table.sin[flat]
+
+    @staticmethod
+    def children(cell):
+        return [(cell[0] + 1, cell[1]), (cell[0], cell[1] + 1)]
+
+
+# Children of a whole level: left at even, right at odd positions, pruned ones dropped.
+# Arrays in `carried` are per-parent values handed down to both children.
+def _next_frontier(end_x, end_y, left_turns, right_turns, lengths, min_length, *carried):
+    n = len(left_turns)
+    child_left = np.empty(2 * n, dtype=np.intp)
+    child_left[0::2] = left_turns + 1
+    child_left[1::2] = left_turns
+    child_right = np.empty(2 * n, dtype=np.intp)
+    child_right[0::2] = right_turns
+    child_right[1::2] = right_turns + 1
+
+    keep = lengths[child_left, child_right] >= min_length
+    return (np.repeat(end_x, 2)[keep], np.repeat(end_y, 2)[keep], child_left[keep], child_right[keep],
+            *(np.repeat(values, 2)[keep] for values in carried))
+
+
+# Breadth-first variant: keeps the frontier as arrays and writes one depth level per step.
+# Each frontier entry carries its (left_turns, right_turns) lattice cell; branch lengths are
+# looked up from the same lattice expression _count_asymmetric prunes on, so the
+# preallocated row count is exact, and directions come from the cell's angle table entry.
+# `cell` roots the subtree in the trunk's lattice as in generate_fractal_tree_asymmetric.
+def generate_fractal_tree_asymmetric_vectorized(x, y, length, angle, left_ratio, right_ratio,
+                                                left_angle_rad, right_angle_rad, min_length,
+                                                start_depth=0, out=None, cell=(0, 0)):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    if lengths[cell] < min_length:
+        return np.empty((0, 5), dtype=np.float64)
+
+    branches = np.empty((counts[cell], 5), dtype=np.float64) if out is None else out
+    n_right = lengths.shape[1]
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, *lengths.shape)
+    xs = np.array([x], dtype=np.float64)
+    ys = np.array([y], dtype=np.float64)
+    left_turns = np.array([cell[0]], dtype=np.intp)
+    right_turns = np.array([cell[1]], dtype=np.intp)
+    depth = start_depth
+    offset = 0
+
+    while len(left_turns) > 0:
+        n = len(left_turns)
+        level_lengths = lengths[left_turns, right_turns]
+        cells = left_turns * n_right + right_turns
+        end_x = xs + level_lengths * table.cos_array[cells]
+        end_y = ys + level_lengths * table.sin_array[cells]
+
+        block = branches[offset:offset + n]
+        block[:, 0] = xs
+        block[:, 1] = ys
+        block[:, 2] = end_x
+        block[:, 3] = end_y
+        block[:, 4] = depth
+        offset += n
+
+        xs, ys, left_turns, right_turns = _next_frontier(end_x, end_y, left_turns, right_turns,
+                                                         lengths, min_length)
+        depth += 1
+
+    return branches[:offset]
+
+
+# Random access into the DFS pre-order of generate_fractal_tree_asymmetric (and the
+# iterative kernel). Within a subtree, rank 0 is its root branch, the next
+# counts[left child] ranks are the left subtree and the rest the right one, so
+# _lattice_counts subtree sizes steer every index down its path one level per step.
+# Lengths are looked up by cell as the kernels do, so rows match theirs exactly.
+def branch_at_asymmetric(indices, x, y, length, angle, left_ratio, right_ratio,
+                         left_angle_rad, right_angle_rad, min_length, start_depth=0):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    n_left, n_right = lengths.shape
+    indices = np.atleast_1d(np.asarray(indices, dtype=np.int64))
+    n_branches = int(counts[0, 0])
+    if indices.size > 0 and (indices.min() < 0 or indices.max() >= n_branches):
+        raise IndexError(f"Branch index out of range for a tree of {n_branches:,} branches")
+
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, n_left, n_right)
+    rank = indices.copy()
+    left_turns = np.zeros(len(rank), dtype=np.intp)
+    right_turns = np.zeros(len(rank), dtype=np.intp)
+    xs = np.full(len(rank), x, dtype=np.float64)
+    ys = np.full(len(rank), y, dtype=np.float64)
+
+    below = rank > 0
+    while below.any():
+        cells = left_turns * n_right + right_turns
+        branch_lengths = lengths[left_turns, right_turns]
+        rank_below = rank - 1
+        left_size = counts[left_turns + 1, right_turns]
+        left = rank_below < left_size
+        xs = np.where(below, xs + branch_lengths * table.cos_array[cells], xs)
+        ys = np.where(below, ys + branch_lengths * table.sin_array[cells], ys)
+        rank = np.where(below, np.where(left, rank_below, rank_below - left_size), rank)
+        left_turns += below & left
+        right_turns += below & ~left
+        below = rank > 0
+
+    cells = left_turns * n_right + right_turns
+    branch_lengths = lengths[left_turns, right_turns]
+    branches = np.empty((len(rank), 5), dtype=np.float64)
+    branches[:, 0] = xs
+    branches[:, 1] = ys
+    branches[:, 2] = xs + branch_lengths * table.cos_array[cells]
+    branches[:, 3] = ys + branch_lengths * table.sin_array[cells]
+    branches[:, 4] = start_depth + left_turns + right_turns
+    return branches
+
+
+# Linked-layout variant of the vectorized engine: the same level-by-level expansion,
+# storing end points, each row's parent link and the first row of every level.
+def generate_fractal_tree_asymmetric_linked(x, y, length, angle, left_ratio, right_ratio,
+                                            left_angle_rad, right_angle_rad, min_length, start_depth=0,
+                                            cell=(0, 0)):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    n_branches = int(counts[cell]) if lengths[cell] >= min_length else 0
+    n_right = lengths.shape[1]
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, *lengths.shape)
+    x2 = np.empty(n_branches, dtype=np.float64)
+    y2 = np.empty(n_branches, dtype=np.float64)
+    parents = np.empty(n_branches, dtype=np.int64)
+    level_starts = []
+    xs = np.array([x], dtype=np.float64)
+    ys = np.array([y], dtype=np.float64)
+    # No frontier at all when even the root is pruned
+    left_turns = np.full(1 if n_branches > 0 else 0, cell[0], dtype=np.intp)
+    right_turns = np.full(len(left_turns), cell[1], dtype=np.intp)
+    level_parents = np.array([-1], dtype=np.int64)
+    offset = 0
+
+    while len(left_turns) > 0:
+        n = len(left_turns)
+        level_lengths = lengths[left_turns, right_turns]
+        cells = left_turns * n_right + right_turns
+        end_x = x2[offset:offset + n]
+        end_y = y2[offset:offset + n]
+        np.add(xs, level_lengths * table.cos_array[cells], out=end_x)
+        np.add(ys, level_lengths * table.sin_array[cells], out=end_y)
+        parents[offset:offset + n] = level_parents
+        level_starts.append(offset)
+
+        rows = np.arange(offset, offset + n, dtype=np.int64)
+        offset += n
+        xs, ys, left_turns, right_turns, level_parents = _next_frontier(end_x, end_y, left_turns, right_turns,
+                                                                        lengths, min_length, rows)
+
+    return LinkedBranches.from_parents(x2, y2, parents, level_starts, (x, y), start_depth)
+
+
+# Lattice cells whose subtree has at most this many branches are instanced
+MAX_CANONICAL_ROWS = 1 << 14
+# Byte budget of the per-process canonical subtree cache
+CANONICAL_CACHE_BYTES = 64 * 1024 * 1024
+
+_canonical_cache = CanonicalCache(CANONICAL_CACHE_BYTES)
+
+
+def _canonical_subtree(length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length, cell):
+    """Subtree rooted at the origin at `cell` of the tree with trunk `length`, depths counted from 0."""
+    # Keyed on the trunk and the cell rather than the root's own length: the subtree is
+    # cut from the trunk's lattice, so it prunes exactly where the other engines do
+    key = (length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length, cell)
+    return _canonical_cache.get(key, lambda: generate_fractal_tree_asymmetric_vectorized(
+        0.0, 0.0, length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length, cell=cell
+    ))
+
+
+# Instancing variant: subtrees whose roots sit in the same (left_turns, right_turns)
+# cell have the same lengths and directions, so they are translated copies of one
+# another. The frontier is expanded breadth-first as in the vectorized engine, except
+# that entries whose cell holds at most MAX_CANONICAL_ROWS branches are set aside. Each
+# such cell is then emitted from one cached canonical subtree with a batched
+# translation. Rows: expanded levels in BFS order, then the instanced blocks cell by cell.
+def generate_fractal_tree_asymmetric_instanced(x, y, length, angle, left_ratio, right_ratio,
+                                               left_angle_rad, right_angle_rad, min_length,
+                                               start_depth=0, out=None, cell=(0, 0)):
+    lengths, counts = _lattice(length, left_ratio, right_ratio, min_length)
+    if lengths[cell] < min_length:
+        return np.empty((0, 5), dtype=np.float64)
+
+    n_right = lengths.shape[1]
+    table = asymmetric_angle_table(angle, left_angle_rad, right_angle_rad, *lengths.shape)
+    xs = np.array([x], dtype=np.float64)
+    ys = np.array([y], dtype=np.float64)
+    left_turns = np.array([cell[0]], dtype=np.intp)
+    right_turns = np.array([cell[1]], dtype=np.intp)
+    depth = start_depth
+    levels = []
+    instances = []
+
+    while len(left_turns) > 0:
+        cells = left_turns * n_right + right_turns
+        small = counts[left_turns, right_turns] <= MAX_CANONICAL_ROWS
+        for flat in np.unique(cells[small]):
+            a, b = divmod(int(flat), n_right)
+            in_cell = small & (cells == flat)
+            canonical = _canonical_subtree(length, angle, left_ratio, right_ratio,
+                                           left_angle_rad, right_angle_rad, min_length, (a, b))
+            instances.append((canonical, xs[in_cell], ys[in_cell], depth))
+
+        large = ~small
+        xs, ys, cells = xs[large], ys[large], cells[large]
+        left_turns, right_turns = left_turns[large], right_turns[large]
+        if len(left_turns) == 0:
+            break
+
+        level_lengths = lengths[left_turns, right_turns]
+        end_x = xs + level_lengths * table.cos_array[cells]
+        end_y = ys + level_lengths * table.sin_array[cells]
+        levels.append(np.column_stack([xs, ys, end_x, end_y, np.full(len(xs), depth, dtype=np.float64)]))
+
+        xs, ys, left_turns, right_turns = _next_frontier(end_x, end_y, left_turns, right_turns,
+                                                         lengths, min_length)
+        depth += 1
+
+    # Canonical subtrees hold exactly counts[cell] rows each, so the total is counts[root]
+    n_branches = (sum(len(level) for level in levels)
+                  + sum(len(canonical) * len(roots) for canonical, roots, _, _ in instances))
+    branches = np.empty((n_branches, 5), dtype=np.float64) if out is None else out
+
+    offset = 0
+    for level in levels:
+        branches[offset:offset + len(level)] = level
+        offset += len(level)
+    # Canonical subtrees already point their cell's way, so copies are only translated
+    for canonical, root_x, root_y, root_depth in instances:
+        n = len(canonical) * len(root_x)
+        instance_subtree(branches[offset:offset + n], canonical, root_x, root_y,
+                         np.ones(len(root_x)), np.zeros(len(root_x)), root_depth)
+        offset += n
+
+    return branches[:offset]
+
+
+ENGINES = {
+    'recursive': generate_fractal_tree_asymmetric,
+    'iterative': generate_fractal_tree_asymmetric_iterative,
+    'vectorized': generate_fractal_tree_asymmetric_vectorized,
+    'instanced': generate_fractal_tree_asymmetric_instanced,
+}
+
+
+# Viewport-culled generation: only subtrees whose bounding disc meets
+# bbox = (xmin, ymin, xmax, ymax) are built, the disc radius using the larger ratio.
+# Rows: the branches straddling the bbox edge in DFS pre-order, then every subtree
+# lying wholly inside it, built by `engine`.
+def generate_fractal_tree_asymmetric_culled(x, y, length, angle, left_ratio, right_ratio,
+                                            left_angle_rad, right_angle_rad, min_length, bbox,
+                                            start_depth=0, engine='iterative', cell=(0, 0)):
+    nodes = _LatticeNodes(length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length)
+    rows, roots = cull_tree(x, y, cell, start_depth, bbox, max(left_ratio, right_ratio), min_length,
+                            nodes.branch, nodes.children)
+    generate = ENGINES[engine]
+    pieces = [np.array(rows, dtype=np.float64).reshape(-1, 5)]
+    pieces += [generate(x, y, length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad,
+                        min_length, start_depth=depth, cell=root)
+               for x, y, root, depth in roots]
+    return np.concatenate(pieces)
+
+
+def select_engine(engine, bbox=None):
+    """Generator function for `engine`, culled to `bbox` when one is given."""
+    if bbox is None:
+        return ENGINES[engine]
+    return partial(generate_fractal_tree_asymmetric_culled, bbox=bbox, engine=engine)
+
+
+# Yields the tree as (chunk_rows, 5) blocks in DFS order without materializing it.
+# chunk_rows defaults to what fits in memory_budget bytes; a tree that fits in one
+# chunk is generated in one piece. Subtrees of at most chunk_rows branches are
+# generated whole by `engine`.
+def iter_fractal_tree_asymmetric(x, y, length, angle, left_ratio, right_ratio,
+                                 left_angle_rad, right_angle_rad, min_length, start_depth=0,
+                                 chunk_rows=None, memory_budget=None, engine='iterative', cell=(0, 0)):
+    chunk_rows = resolve_chunk_rows(chunk_rows, memory_budget)
+    generate = ENGINES[engine]
+    nodes = _LatticeNodes(length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length)
+    total = nodes.subtree_size(cell)
+    if total == 0:
+        return
+    if total <= chunk_rows:
+        yield generate(x, y, length, angle, left_ratio, right_ratio, left_angle_rad, right_angle_rad,
+                       min_length, start_depth=start_depth, cell=cell)
+        return
+
+    pieces = dfs_pieces(
+        x, y, cell, start_depth, chunk_rows, nodes.subtree_size, nodes.branch, nodes.children,
+        lambda x, y, node, depth: generate(x, y, length, angle, left_ratio, right_ratio,
+                                           left_angle_rad, right_angle_rad, min_length,
+                                           start_depth=depth, cell=node),
+    )
+    yield from pack_chunks(pieces, chunk_rows)
+
+
 def run_sequential_asymmetric(trunk_length=100.0, left_ratio=0.67, right_ratio=0.57,
-                               left_angle=35.0, right_angle=25.0, min_length=1.0):
+                               left_angle=35.0, right_angle=25.0, min_length=1.0,
+                               engine='iterative', compact=False, bbox=None, pixel_size=None,
+                               collect='rows'):
+
+    if collect not in COLLECT_MODES:
+        raise ValueError(f"Unknown collect mode: {collect}")
+    if collect == 'summary' and compact:
+        raise ValueError("collect='summary' returns no rows; it excludes compact")
 
     left_angle_rad  = math.radians(left_angle)
     right_angle_rad = math.radians(right_angle)
+    generate_min_length = effective_min_length(min_length, pixel_size)
+    generate = select_engine(engine, bbox)
+    if compact:
+        generate = partial(generate_compact, generate)
 
     print_header("Sequential Asymmetric (Python)")
     print_params(trunk_length, left_ratio, left_angle, min_length,
-                 right_ratio=right_ratio, right_angle=right_angle)
+                 right_ratio=right_ratio, right_angle=right_angle, engine=engine,
+                 compact=compact, bbox=bbox, pixel_size=pixel_size, collect=collect)
 
     start_time = time.perf_counter()
-    branches = generate_fractal_tree_asymmetric(
-        0, 0, trunk_length, math.pi / 2,
-        left_ratio, right_ratio, left_angle_rad, right_angle_rad, min_length
-    )
+    if collect == 'summary':
+        # Same chunked reduction as the parallel workers, the tree is never materialized
+        if bbox is None:
+            chunks = iter_fractal_tree_asymmetric(
+                0, 0, trunk_length, math.pi / 2,
+                left_ratio, right_ratio, left_angle_rad, right_angle_rad, generate_min_length,
+                chunk_rows=REDUCTION_CHUNK_ROWS, engine=engine
+            )
+        else:
+            chunks = [generate(0, 0, trunk_length, math.pi / 2,
+                               left_ratio, right_ratio, left_angle_rad, right_angle_rad, generate_min_length)]
+        summary = TreeSummary.from_chunks(chunks)
+    else:
+        branches = generate(
+            0, 0, trunk_length, math.pi / 2,
+            left_ratio, right_ratio, left_angle_rad, right_angle_rad, generate_min_length
+        )
     execution_time = time.perf_counter() - start_time
 
-    max_depth = int(branches[:, 4].max()) if len(branches) > 0 else 0
-    print_result(execution_time, len(branches), max_depth)
+    if collect == 'summary':
+        total_branches, max_depth = summary.count, summary.max_depth
+    else:
+        total_branches = len(branches)
+        depths = branches.depth if compact else branches[:, 4]
+        max_depth = int(depths.max()) if total_branches > 0 else 0
+    print_result(execution_time, total_branches, max_depth)
 
     result = {
         'parameters': {
@@ -70,9 +511,16 @@ def run_sequential_asymmetric(trunk_length=100.0, left_ratio=0.67, right_ratio=0
             'left_angle': left_angle,
             'right_angle': right_angle,
             'min_length': min_length,
+            'engine': engine,
+            'compact': compact,
+            'bbox': bbox,
+            'pixel_size': pixel_size,
+            'collect': collect,
         },
         'execution_time': execution_time,
     }
+    if collect == 'summary':
+        result['summary'] = summary.as_dict()
 
     return result
 
@@ -0,0 +1,146 @@
+import numpy as np
+
+COORD_DTYPE = np.float32
+DEPTH_DTYPE = np.uint8
+# A segment's float32 offsets stay within this many times the length of each of its
+# branches, which bounds a branch's relative error near 2 * 2^-24 * this ratio (~1.5e-5)
+MAX_OFFSET_RATIO = 128.0
+# Largest segment; segments start at multiples of their power-of-two size
+SEGMENT_ROWS = 1 << 12
+# Rows segmented per step, a multiple of SEGMENT_ROWS that keeps the temporaries cache-sized
+ANCHOR_BLOCK_ROWS = 1 << 15
+
+
+# Structure-of-arrays branch storage: x1, y1, x2, y2 as float32 and depth as uint8,
+# 17 bytes per branch instead of 40 for an (N, 5) float64 row.
+#
+# Coordinates are stored relative to a float64 anchor per segment of consecutive rows,
+# so float32 keeps its precision deep in the tree. Each segment has its origin in
+# `origins`, and `starts` holds the first row of every segment. Segments are cut by
+# _anchor_segments from the rows themselves, whatever engine and order made them.
+class CompactBranches:
+
+    def __init__(self, x1, y1, x2, y2, depth, origins, starts):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.depth = depth
+        self.origins = origins
+        self.starts = starts
+
+    @classmethod
+    def from_local(cls, rows, origin=(0.0, 0.0)):
+        """Compact (N, 5) rows whose coordinates are relative to `origin`."""
+        if len(rows) > 0 and rows[:, 4].max() > np.iinfo(DEPTH_DTYPE).max:
+            raise ValueError("Depth does not fit in uint8 storage")
+        starts = _anchor_segments(rows)
+        anchors = rows[starts, :2]
+        counts = np.diff(np.append(starts, len(rows)))
+        anchor_x = np.repeat(anchors[:, 0], counts)
+        anchor_y = np.repeat(anchors[:, 1], counts)
+        return cls(
+            (rows[:, 0] - anchor_x).astype(COORD_DTYPE),
+            (rows[:, 1] - anchor_y).astype(COORD_DTYPE),
+            (rows[:, 2] - anchor_x).astype(COORD_DTYPE),
+            (rows[:, 3] - anchor_y).astype(COORD_DTYPE),
+            rows[:, 4].astype(DEPTH_DTYPE),
+            anchors + np.asarray(origin, dtype=np.float64),
+            starts,
+        )
+
+    @classmethod
+    def from_array(cls, branches):
+        """Compact (N, 5) rows in absolute coordinates."""
+        return cls.from_local(branches)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """Join parts in order, keeping every part's segment origins."""
+        row_offsets = np.cumsum([0] + [len(part) for part in parts[:-1]])
+        return cls(
+            np.concatenate([part.x1 for part in parts]),
+            np.concatenate([part.y1 for part in parts]),
+            np.concatenate([part.x2 for part in parts]),
+            np.concatenate([part.y2 for part in parts]),
+            np.concatenate([part.depth for part in parts]),
+            np.concatenate([part.origins for part in parts]),
+            np.concatenate([part.starts + offset for part, offset in zip(parts, row_offsets)]),
+        )
+
+    def __len__(self):
+        return len(self.depth)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in
+                   (self.x1, self.y1, self.x2, self.y2, self.depth, self.origins, self.starts))
+
+    def to_array(self):
+        """Expand to the (N, 5) float64 layout (x1, y1, x2, y2, depth) in absolute coordinates."""
+        counts = np.diff(np.append(self.starts, len(self)))
+        origin_x = np.repeat(self.origins[:, 0], counts)
+        origin_y = np.repeat(self.origins[:, 1], counts)
+        branches = np.empty((len(self), 5), dtype=np.float64)
+        branches[:, 0] = origin_x + self.x1
+        branches[:, 1] = origin_y + self.y1
+        branches[:, 2] = origin_x + self.x2
+        branches[:, 3] = origin_y + self.y2
+        branches[:, 4] = self.depth
+        return branches
+
+
+def _anchor_segments(rows):
+    """First row of every segment: the largest aligned power-of-two blocks, up to
+    SEGMENT_ROWS rows, whose points all lie within MAX_OFFSET_RATIO times the block's
+    shortest branch of its first start point, the anchor. A single row always fits."""
+    starts = [start + _block_segments(rows[start:start + ANCHOR_BLOCK_ROWS])
+              for start in range(0, len(rows), ANCHOR_BLOCK_ROWS)]
+    return np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+
+
+def _block_segments(rows):
+    n_rows = len(rows)
+    n_levels = min(SEGMENT_ROWS, 1 << (n_rows - 1).bit_length()).bit_length()
+    padded = -(-n_rows // (1 << (n_levels - 1))) * (1 << (n_levels - 1))
+
+    def pad(values, fill):
+        return np.concatenate([values, np.full(padded - n_rows, fill)])
+
+    # Per block: bounding box of its points and its shortest branch (inf-norm), halving
+    # the block count level by level
+    low_x = pad(np.minimum(rows[:, 0], rows[:, 2]), np.inf)
+    low_y = pad(np.minimum(rows[:, 1], rows[:, 3]), np.inf)
+    high_x = pad(np.maximum(rows[:, 0], rows[:, 2]), -np.inf)
+    high_y = pad(np.maximum(rows[:, 1], rows[:, 3]), -np.inf)
+    shortest = pad(np.maximum(np.abs(rows[:, 2] - rows[:, 0]), np.abs(rows[:, 3] - rows[:, 1])), np.inf)
+    anchor_x = pad(rows[:, 0], 0.0)
+    anchor_y = pad(rows[:, 1], 0.0)
+
+    fits = []
+    for level in range(n_levels):
+        if level > 0:
+            low_x, low_y = np.minimum(low_x[0::2], low_x[1::2]), np.minimum(low_y[0::2], low_y[1::2])
+            high_x, high_y = np.maximum(high_x[0::2], high_x[1::2]), np.maximum(high_y[0::2], high_y[1::2])
+            shortest = np.minimum(shortest[0::2], shortest[1::2])
+        block_x, block_y = anchor_x[::1 << level], anchor_y[::1 << level]
+        offset = np.maximum(np.maximum(block_x - low_x, high_x - block_x),
+                            np.maximum(block_y - low_y, high_y - block_y))
+        fits.append((offset <= MAX_OFFSET_RATIO * shortest) | (level == 0))
+
+    # Largest fitting block first; smaller ones only where no larger block was taken
+    starts = []
+    covered = np.zeros(len(fits[-1]), dtype=bool)
+    for level in range(n_levels - 1, -1, -1):
+        if level < n_levels - 1:
+            covered = np.repeat(covered, 2)
+        taken = fits[level] & ~covered
+        starts.append(np.nonzero(taken)[0] << level)
+        covered |= taken
+    starts = np.sort(np.concatenate(starts))
+    return starts[starts < n_rows]
+
+
+def generate_compact(generate, x, y, *args, **kwargs):
+    """Run an (N, 5) engine around a local origin and store its rows compactly at (x, y)."""
+    return CompactBranches.from_local(generate(0.0, 0.0, *args, **kwargs), origin=(x, y))
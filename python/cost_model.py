@@ -0,0 +1,170 @@
+import heapq
+import json
+import math
+import os
+import time
+from math import comb
+from multiprocessing import Pool
+import numpy as np
+from symmetric_sequential import ENGINES as SYMMETRIC_ENGINES, _count_symmetric
+from asymmetric_sequential import ENGINES as ASYMMETRIC_ENGINES, _lattice
+
+# Calibrated costs are measured once per machine and kept here, keyed by tree and engine
+CACHE_PATH = os.environ.get(
+    'FRACTAL_TREE_COST_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'fractal_tree', 'cost_model.json'),
+)
+MAX_SPLIT_DEPTH = 12
+CALIBRATION_RUNS = 3
+PROBE_TASKS = 64
+PROBE_ROWS = 50_000
+# Pool.map chunks in task order ('static') or one task at a time, largest first ('lpt')
+SCHEDULES = ('static', 'lpt')
+
+
+# ---------------------------------------------------------------------------
+# Exact subtask sizes at a uniform split depth
+# ---------------------------------------------------------------------------
+def subtask_sizes_symmetric(trunk_length, ratio, min_length, split_depth):
+    """All 2^d subtasks start at trunk * ratio^d, so they are equal in size."""
+    size = _count_symmetric(trunk_length * ratio ** split_depth, ratio, min_length)
+    return [size] * 2 ** split_depth if size > 0 else []
+
+
+def subtask_sizes_asymmetric(trunk_length, left_ratio, right_ratio, min_length, split_depth):
+    """C(d, k) subtasks start after k left and d-k right turns; sizes from the trunk's lattice."""
+    _, counts = _lattice(trunk_length, left_ratio, right_ratio, min_length)
+    sizes = []
+    for k in range(split_depth + 1):
+        cell = (k, split_depth - k)
+        size = int(counts[cell]) if k < counts.shape[0] and split_depth - k < counts.shape[1] else 0
+        if size > 0:
+            sizes.extend([size] * comb(split_depth, k))
+    return sizes
+
+
+# ---------------------------------------------------------------------------
+# Calibration
+# ---------------------------------------------------------------------------
+def _ipc_probe(rows):
+    return np.zeros((rows, 5), dtype=np.float64)
+
+
+def _best_time(fn, runs=CALIBRATION_RUNS):
+    best = math.inf
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _per_branch(generate, args):
+    n_branches = len(generate(*args))
+    return _best_time(lambda: generate(*args)) / n_branches
+
+
+def calibrate(tree, engine, pool):
+    """Measure per-branch, per-task and per-row IPC costs (seconds) on this machine."""
+    if tree == 'symmetric':
+        engines = SYMMETRIC_ENGINES
+        args = (0, 0, 100.0, math.pi / 2, 0.67, math.radians(30.0), 0.2)   # 65,535 branches
+    else:
+        engines = ASYMMETRIC_ENGINES
+        args = (0, 0, 100.0, math.pi / 2, 0.67, 0.57, math.radians(35.0), math.radians(25.0), 0.05)
+
+    per_task = _best_time(lambda: pool.map(_ipc_probe, [0] * PROBE_TASKS, chunksize=1)) / PROBE_TASKS
+    transfer = _best_time(lambda: pool.map(_ipc_probe, [PROBE_ROWS] * 8, chunksize=1))
+    return {
+        'per_branch': _per_branch(engines[engine], args),
+        # The upper levels are always built by the per-branch Python walk in partition_tree
+        'per_upper_branch': _per_branch(engines['recursive'], args),
+        'per_task': per_task,
+        'per_row': max(0.0, transfer - 8 * per_task) / (8 * PROBE_ROWS),
+    }
+
+
+def load_costs(tree, engine, pool=None, num_processes=None, cache_path=CACHE_PATH):
+    """Calibrated costs for (tree, engine), measured on first use and cached on disk."""
+    key = f'{tree}:{engine}'
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+    if key in cache:
+        return cache[key]
+
+    if pool is None:
+        with Pool(processes=num_processes) as calibration_pool:
+            cache[key] = calibrate(tree, engine, calibration_pool)
+    else:
+        cache[key] = calibrate(tree, engine, pool)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    return cache[key]
+
+
+# ---------------------------------------------------------------------------
+# Makespan prediction
+# ---------------------------------------------------------------------------
+def _makespan(task_costs, num_processes, chunksize):
+    # Chunks go to whichever worker frees up first, as Pool.map / imap_unordered do
+    heap = [0.0] * num_processes
+    for start in range(0, len(task_costs), chunksize):
+        earliest = heapq.heappop(heap)
+        heapq.heappush(heap, earliest + sum(task_costs[start:start + chunksize]))
+    return max(heap)
+
+
+def predict_time(n_upper, sizes, num_processes, costs, shared_output=False, schedule='static'):
+    """Predicted wall time (seconds) of one parallel generation with the given subtasks."""
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {schedule}")
+    task_costs = [costs['per_task'] + size * costs['per_branch'] for size in sizes]
+    if schedule == 'lpt':
+        task_costs.sort(reverse=True)
+        chunksize = 1
+    else:
+        # Same chunking rule as Pool.map
+        chunksize, extra = divmod(len(task_costs), num_processes * 4)
+        chunksize += 1 if extra else 0
+    transfer = 0.0 if shared_output else sum(sizes) * costs['per_row']
+    return (n_upper * costs['per_upper_branch']
+            + _makespan(task_costs, num_processes, max(1, chunksize))
+            + transfer)
+
+
+def best_split_depth(sizes_at, num_processes, costs, shared_output=False, schedule='static',
+                     max_depth=MAX_SPLIT_DEPTH):
+    """Split depth in 1..max_depth with the lowest predicted time; sizes_at(d) gives subtask sizes."""
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {schedule}")
+    best_depth, best_time = 1, math.inf
+    for depth in range(1, max_depth + 1):
+        sizes = sizes_at(depth)
+        if not sizes:
+            break
+        predicted = predict_time(2 ** depth - 1, sizes, num_processes, costs, shared_output, schedule)
+        if predicted < best_time:
+            best_depth, best_time = depth, predicted
+    return best_depth
+
+
+def auto_split_depth_symmetric(trunk_length, ratio, min_length, num_processes,
+                               engine='iterative', shared_output=False, pool=None):
+    costs = load_costs('symmetric', engine, pool, num_processes)
+    return best_split_depth(
+        lambda d: subtask_sizes_symmetric(trunk_length, ratio, min_length, d),
+        num_processes, costs, shared_output,
+    )
+
+
+def auto_split_depth_asymmetric(trunk_length, left_ratio, right_ratio, min_length, num_processes,
+                                engine='iterative', shared_output=False, schedule='static', pool=None):
+    costs = load_costs('asymmetric', engine, pool, num_processes)
+    return best_split_depth(
+        lambda d: subtask_sizes_asymmetric(trunk_length, left_ratio, right_ratio, min_length, d),
+        num_processes, costs, shared_output, schedule,
+    )
@@ -0,0 +1,69 @@
+# Viewport culling. Every branch of a subtree whose root branch starts at (x, y) with
+# length L lies within L + rL + r^2 L + ... = L / (1 - r) of (x, y), r being the larger
+# length ratio. A subtree whose disc misses the viewport is dropped whole, and one whose
+# disc lies inside it is generated without further checks.
+#
+# bbox is (xmin, ymin, xmax, ymax) in tree coordinates.
+
+def subtree_radius(length, max_ratio):
+    return length / (1.0 - max_ratio)
+
+
+def disc_intersects(x, y, radius, bbox):
+    xmin, ymin, xmax, ymax = bbox
+    dx = max(xmin - x, 0.0, x - xmax)
+    dy = max(ymin - y, 0.0, y - ymax)
+    return dx * dx + dy * dy <= radius * radius
+
+
+def disc_inside(x, y, radius, bbox):
+    xmin, ymin, xmax, ymax = bbox
+    return xmin <= x - radius and x + radius <= xmax and ymin <= y - radius and y + radius <= ymax
+
+
+def translate_bbox(bbox, dx, dy):
+    xmin, ymin, xmax, ymax = bbox
+    return xmin + dx, ymin + dy, xmax + dx, ymax + dy
+
+
+def effective_min_length(min_length, pixel_size=None):
+    """Refinement stops at min_length or at one pixel, whichever is longer."""
+    return min_length if pixel_size is None else max(min_length, pixel_size)
+
+
+# Walks the subtree with an explicit stack and sorts it against `bbox`. Nodes and the
+# branch / children callbacks are those of partition.partition_tree.
+#
+# Returns (rows, roots): rows of the branches whose subtree straddles the bbox edge, in
+# DFS pre-order, and (x, y, node, depth) of the subtrees lying wholly inside it, in
+# DFS order. Everything else cannot reach the bbox and is skipped.
+def cull_tree(x, y, node, depth, bbox, max_ratio, min_length, branch, children):
+    rows = []
+    roots = []
+    stack = [(x, y, node, depth)]
+
+    while stack:
+        x, y, node, depth = stack.pop()
+        length, cos_t, sin_t = branch(node)
+        if length < min_length:
+            continue
+        radius = subtree_radius(length, max_ratio)
+        if not disc_intersects(x, y, radius, bbox):
+            continue
+        if disc_inside(x, y, radius, bbox):
+            roots.append((x, y, node, depth))
+            continue
+
+        end_x = x + length * cos_t
+        end_y = y + length * sin_t
+        rows.append((x, y, end_x, end_y, depth))
+        stack.extend(reversed([(end_x, end_y, child, depth + 1) for child in children(node)]))
+
+    return rows, roots
+
+
+def tree_bounds(trunk_length, max_ratio):
+    """Bounding box of a whole tree whose vertical trunk starts at the origin: the trunk,
+    plus the disc around its tip that holds everything above it."""
+    radius = subtree_radius(trunk_length * max_ratio, max_ratio)
+    return -radius, min(0.0, trunk_length - radius), radius, trunk_length + radius
@@ -0,0 +1,56 @@
+import numpy as np
+
+# 'count': every branch adds 1; 'length': every branch adds its length
+DENSITY_WEIGHTS = ('count', 'length')
+
+
+def grid_shape(grid_size):
+    """(rows, columns) of the density grid; an int gives a square grid."""
+    if isinstance(grid_size, int):
+        return grid_size, grid_size
+    width, height = grid_size
+    return height, width
+
+
+# Adds (N, 5) branch rows to `grid`, which covers bbox = (xmin, ymin, xmax, ymax) with
+# row 0 at the top. A branch is cut into pieces no longer than one cell and its weight
+# is spread evenly over them, so long upper branches do not pile up in a single cell.
+# Pieces outside the bbox are dropped.
+def accumulate(grid, branches, bbox, weight='count'):
+    n_rows, n_cols = grid.shape
+    xmin, ymin, xmax, ymax = bbox
+    scale_x = n_cols / (xmax - xmin)
+    scale_y = n_rows / (ymax - ymin)
+
+    dx = (branches[:, 2] - branches[:, 0]) * scale_x
+    dy = (branches[:, 3] - branches[:, 1]) * scale_y
+    pieces = np.maximum(1, np.ceil(np.maximum(np.abs(dx), np.abs(dy)))).astype(np.intp)
+    if weight == 'length':
+        totals = np.hypot(branches[:, 2] - branches[:, 0], branches[:, 3] - branches[:, 1])
+    else:
+        totals = np.ones(len(branches))
+
+    owner = np.repeat(np.arange(len(branches)), pieces)
+    first = np.repeat(np.cumsum(pieces) - pieces, pieces)
+    t = (np.arange(pieces.sum()) - first + 0.5) / pieces[owner]
+    cols = np.floor((branches[owner, 0] - xmin) * scale_x + t * dx[owner]).astype(np.intp)
+    rows = n_rows - 1 - np.floor((branches[owner, 1] - ymin) * scale_y + t * dy[owner]).astype(np.intp)
+
+    inside = (cols >= 0) & (cols < n_cols) & (rows >= 0) & (rows < n_rows)
+    cells = rows[inside] * n_cols + cols[inside]
+    weights = (totals / pieces)[owner][inside]
+    grid += np.bincount(cells, weights=weights, minlength=grid.size).reshape(grid.shape)
+
+
+def accumulate_chunks(chunks, shape, bbox, weight='count'):
+    """Fresh grid holding every chunk of rows; returns (grid, branch count, max depth)."""
+    grid = np.zeros(shape, dtype=np.float64)
+    n_branches = 0
+    max_depth = 0
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        accumulate(grid, chunk, bbox, weight)
+        n_branches += len(chunk)
+        max_depth = max(max_depth, int(chunk[:, 4].max()))
+    return grid, n_branches, max_depth
@@ -1,12 +1,11 @@
 import math
-import time
 import contextlib
 import io
 import csv
 import os
 
-from asymmetric_sequential import generate_fractal_tree_asymmetric
-from asymmetric_parallel import run_parallel_asymmetric
+from asymmetric_sequential import run_sequential_asymmetric
+from tree_generator import FractalTreeGenerator
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
 OUTPUT_DIR   = os.path.join(PROJECT_ROOT, 'data', 'asymmetric', 'split_depth')
@@ -19,8 +18,15 @@ CSV_PATH     = os.path.join(OUTPUT_DIR, 'empirical_python.csv')
 # Each depth is run NUM_RUNS times; mean is reported.
 #
 # Purpose: find the empirically optimal split_depth for Python multiprocessing.
-# Hypothesis: deeper splits increase pickle/IPC overhead and worsen performance
-# even though T_worst analysis predicts improvement at depth ~11.
+# Every run uses collect='summary', so workers reduce their subtrees in place and
+# each task ships back a fixed-size summary, never rows: result IPC does not grow
+# with the tree. What varies with depth is the trade-off between load balance
+# (more, smaller subtasks even out the lopsided lattice) and the fixed costs that
+# grow with the task count: per-task dispatch, merging the summaries, and the
+# 2^d - 1 upper branches the parent walks before dispatching.
+#
+# All runs share one warm worker pool, so the timings exclude process startup;
+# pool startup is reported separately.
 
 NUM_PROCESSES = 8
 NUM_RUNS      = 3
@@ -34,27 +40,31 @@ SPLIT_DEPTHS  = list(range(1, 13))
 
 
 def _time_sequential():
-    left_rad  = math.radians(LEFT_ANGLE)
-    right_rad = math.radians(RIGHT_ANGLE)
-    t0 = time.perf_counter()
-    branches = generate_fractal_tree_asymmetric(
-        0, 0, TRUNK_LENGTH, math.pi / 2,
-        LEFT_RATIO, RIGHT_RATIO, left_rad, right_rad, MIN_LENGTH,
-    )
-    return time.perf_counter() - t0, len(branches)
+    # Same engine and summary reduction as the parallel runs, so speedup compares one workload
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_sequential_asymmetric(
+            trunk_length=TRUNK_LENGTH,
+            left_ratio=LEFT_RATIO,
+            right_ratio=RIGHT_RATIO,
+            left_angle=LEFT_ANGLE,
+            right_angle=RIGHT_ANGLE,
+            min_length=MIN_LENGTH,
+            collect='summary',
+        )
+    return result['execution_time'], result['summary']['count']
 
 
-def _time_parallel(split_depth):
+def _time_parallel(generator, split_depth):
     with contextlib.redirect_stdout(io.StringIO()):
-        result = run_parallel_asymmetric(
+        result = generator.run_parallel_asymmetric(
             trunk_length=TRUNK_LENGTH,
             left_ratio=LEFT_RATIO,
             right_ratio=RIGHT_RATIO,
             left_angle=LEFT_ANGLE,
             right_angle=RIGHT_ANGLE,
             min_length=MIN_LENGTH,
-            num_processes=NUM_PROCESSES,
             split_depth=split_depth,
+            collect='summary',
         )
     return result['execution_time']
 
@@ -73,23 +83,29 @@ if __name__ == '__main__':
     rows = []
     current_heuristic = max(1, math.ceil(math.log2(NUM_PROCESSES * 4)))
 
-    for depth in SPLIT_DEPTHS:
-        times = [_time_parallel(depth) for _ in range(NUM_RUNS)]
-        par_mean  = sum(times) / NUM_RUNS
-        speedup   = seq_time / par_mean
-        efficiency = speedup / NUM_PROCESSES
-        note = "<-- heuristic" if depth == current_heuristic else ""
-
-        print(f"{depth:>6} {num_tasks_at(depth):>7,} {par_mean:>13.5f} {speedup:>8.3f}x {efficiency:>11.1%}  {note}")
-        rows.append({
-            'split_depth': depth,
-            'num_tasks':   num_tasks_at(depth),
-            'branches':    branch_count,
-            'seq_time':    f'{seq_time:.6f}',
-            'par_mean':    f'{par_mean:.6f}',
-            'speedup':     f'{speedup:.4f}',
-            'efficiency':  f'{efficiency:.4f}',
-        })
+    with FractalTreeGenerator(num_processes=NUM_PROCESSES) as generator:
+        for depth in SPLIT_DEPTHS:
+            times = [_time_parallel(generator, depth) for _ in range(NUM_RUNS)]
+            par_mean  = sum(times) / NUM_RUNS
+            speedup   = seq_time / par_mean
+            efficiency = speedup / NUM_PROCESSES
+            note = "<-- heuristic" if depth == current_heuristic else ""
+
+            print(f"{depth:>6} {num_tasks_at(depth):>7,} {par_mean:>13.5f} {speedup:>8.3f}x {efficiency:>11.1%}  {note}")
+            rows.append({
+                'split_depth': depth,
+                'num_tasks':   num_tasks_at(depth),
+                'branches':    branch_count,
+                'seq_time':    f'{seq_time:.6f}',
+                'par_mean':    f'{par_mean:.6f}',
+                'speedup':     f'{speedup:.4f}',
+                'efficiency':  f'{efficiency:.4f}',
+            })
+
+    pool_stats = generator.stats()
+    print(f"\n  Pool startup: {pool_stats['pool_startup_time']:.5f}s | "
+          f"lifetime: {pool_stats['pool_lifetime']:.5f}s | "
+          f"compute: {pool_stats['compute_time']:.5f}s over {pool_stats['generations']} runs")
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     with open(CSV_PATH, 'w', newline='') as f:
@@ -8,5 +8,6 @@ result = run_sequential_asymmetric(
     left_angle=35.0,
     right_angle=25.0,
     min_length=0.01,
+    collect='summary',
 )
 print(f"Finish in {result['execution_time']:.5f} seconds(s)")
@@ -11,5 +11,6 @@ if __name__ == '__main__':
         right_angle=25.0,
         min_length=0.003819,
         num_processes=4,
+        collect='summary',
     )
     print(f"Finish in {result['execution_time']:.5f} seconds(s)")
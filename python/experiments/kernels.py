@@ -0,0 +1,74 @@
+import math
+import time
+import csv
+import os
+
+from symmetric_sequential import generate_fractal_tree, generate_fractal_tree_iterative
+from asymmetric_sequential import generate_fractal_tree_asymmetric, generate_fractal_tree_asymmetric_iterative
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+OUTPUT_DIR   = os.path.join(PROJECT_ROOT, 'data', 'kernels')
+CSV_PATH     = os.path.join(OUTPUT_DIR, 'empirical_python.csv')
+
+# Recursive vs iterative DFS kernel — both trees, Python, single process
+# Fixed: trunk=100.0, min_length=0.01
+#
+# Each kernel is run NUM_RUNS times on the same tree; the best run is reported
+# as branches per second. Both kernels write identical rows in the same order.
+
+NUM_RUNS     = 3
+TRUNK_LENGTH = 100.0
+MIN_LENGTH   = 0.01
+
+SYMMETRIC_ARGS  = (0, 0, TRUNK_LENGTH, math.pi / 2, 0.67, math.radians(30.0), MIN_LENGTH)
+ASYMMETRIC_ARGS = (0, 0, TRUNK_LENGTH, math.pi / 2, 0.67, 0.57,
+                   math.radians(35.0), math.radians(25.0), MIN_LENGTH)
+
+KERNELS = [
+    ('symmetric',  'recursive', generate_fractal_tree,                      SYMMETRIC_ARGS),
+    ('symmetric',  'iterative', generate_fractal_tree_iterative,            SYMMETRIC_ARGS),
+    ('asymmetric', 'recursive', generate_fractal_tree_asymmetric,           ASYMMETRIC_ARGS),
+    ('asymmetric', 'iterative', generate_fractal_tree_asymmetric_iterative, ASYMMETRIC_ARGS),
+]
+
+
+def _best_time(generate, args):
+    best = math.inf
+    for _ in range(NUM_RUNS):
+        t0 = time.perf_counter()
+        branches = generate(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, len(branches)
+
+
+if __name__ == '__main__':
+    print(f"\n=== Recursive vs iterative kernel (Python) | runs={NUM_RUNS}, min_length={MIN_LENGTH} ===")
+    print(f"{'tree':>11} {'kernel':>10} {'branches':>12} {'best (s)':>10} {'branches/s':>14} {'speedup':>9}")
+    print("-" * 71)
+
+    rows = []
+    baseline = {}
+    for tree, kernel, generate, args in KERNELS:
+        best, branch_count = _best_time(generate, args)
+        rate = branch_count / best
+        baseline.setdefault(tree, best)
+        speedup = baseline[tree] / best
+
+        print(f"{tree:>11} {kernel:>10} {branch_count:>12,} {best:>10.5f} {rate:>14,.0f} {speedup:>8.3f}x")
+        rows.append({
+            'tree':           tree,
+            'kernel':         kernel,
+            'branches':       branch_count,
+            'best_time':      f'{best:.6f}',
+            'branches_per_s': f'{rate:.0f}',
+            'speedup':        f'{speedup:.4f}',
+        })
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(CSV_PATH, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[
+            'tree', 'kernel', 'branches', 'best_time', 'branches_per_s', 'speedup'
+        ])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nSaved: {CSV_PATH}")
@@ -9,5 +9,6 @@ if __name__ == '__main__':
         min_length=0.01,
         num_processes=2,
         split_depth=5,
+        collect='summary',
     )
     print(f"Finish in {result['execution_time']:.5f} seconds(s)")
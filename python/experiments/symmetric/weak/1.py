@@ -6,5 +6,6 @@ result = run_sequential(
     ratio=0.67,
     branch_angle=30.0,
     min_length=0.04,
+    collect='summary',
 )
 print(f"Finish in {result['execution_time']:.5f} seconds(s)")
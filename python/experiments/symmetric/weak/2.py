@@ -9,5 +9,6 @@ if __name__ == '__main__':
         branch_angle=30.0,
         min_length=0.0268,
         num_processes=2,
+        collect='summary',
     )
     print(f"Finish in {result['execution_time']:.5f} seconds(s)")
@@ -0,0 +1,272 @@
+from fractions import Fraction
+import numpy as np
+from render import BACKGROUND, depth_style, tree_extent
+from tree_file import COLUMNS, create_tree_file, map_rows, plan_levels, write_levels
+from tree_stats import tree_stats
+
+SPACE, MINUS, POINT = ord(' '), ord('-'), ord('.')
+
+
+# Chunk writers for exporting a tree that arrives as a stream of (n, 5) row blocks, as
+# from iter_parallel*. write(chunk) returns the bytes it wrote, close() finishes the file.
+class ChunkWriter:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+
+    def write(self, chunk):
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter(ChunkWriter):
+    """Text rows x1,y1,x2,y2,depth with a header line; coordinates round-trip exactly."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.file.write((','.join(COLUMNS) + '\n').encode('ascii'))
+
+    def write(self, chunk):
+        start = self.file.tell()
+        np.savetxt(self.file, chunk, fmt=['%.17g'] * 4 + ['%d'], delimiter=',')
+        return self.file.tell() - start
+
+
+class RawWriter(ChunkWriter):
+    """Headerless little-endian float64 rows, in arrival order."""
+
+    def write(self, chunk):
+        data = np.ascontiguousarray(chunk, dtype='<f8').tobytes()
+        self.file.write(data)
+        return len(data)
+
+
+# Vectorized fixed-point formatting. Every value of a column becomes an ASCII field of
+# one common width, right-aligned: a sign column, the integer digits (leading zeros
+# blanked, the minus sign moved next to the first digit), a point and `decimals`
+# digits, exactly as '%.*f' prints them. Values are scaled to integers held in float64,
+# where dividing by a power of ten and flooring is exact below 2^50; they are split
+# into 4-digit groups whose ASCII comes from a 10000-entry table, so a column costs a
+# few array passes instead of a Python format call per value.
+MAX_FIXED_MAGNITUDE = 2.0 ** 50
+# Rows formatted per step, keeping the temporaries cache-sized
+FORMAT_BLOCK_ROWS = 1 << 13
+
+_GROUP_DIGITS = 4
+_GROUP_ASCII = np.frombuffer(b''.join(b'%04d' % group for group in range(10 ** _GROUP_DIGITS)), dtype=np.uint32)
+
+
+def format_fixed(values, decimals, lead=1):
+    """values.shape + (width,) uint8 ASCII fields of `values` rounded to `decimals`
+    places, all of one width; `lead` blank columns precede the widest value's sign."""
+    shape = values.shape
+    values = values.reshape(-1)
+    scaled = np.abs(values) * (10.0 ** decimals)
+    magnitude = np.rint(scaled)
+    # The scaling product is rounded, so a value within a few ulps of a half may land on
+    # the wrong side of it; printf rounds the exact binary value, half to even, and so
+    # are these few
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    for i in np.nonzero(near_half)[0]:
+        magnitude[i] = round(abs(Fraction(float(values[i]))) * 10 ** decimals)
+    largest = float(magnitude.max()) if len(values) > 0 else 0.0
+    if largest >= MAX_FIXED_MAGNITUDE:
+        raise ValueError("Value too large for fixed-point formatting")
+    n_digits = max(len(str(int(largest))), decimals + 1)
+    int_digits = n_digits - decimals
+    n_groups = -(-n_digits // _GROUP_DIGITS)
+
+    # Most significant group first; the padding digits of the first group are dropped
+    quotients = np.floor(magnitude[:, None] / float(10 ** _GROUP_DIGITS) ** np.arange(n_groups - 1, -1, -1))
+    quotients[:, 1:] -= float(10 ** _GROUP_DIGITS) * quotients[:, :-1]
+    digits = _GROUP_ASCII[quotients.astype(np.intp)].view(np.uint8)[:, n_groups * _GROUP_DIGITS - n_digits:]
+    # Integer digits above the units that are leading zeros
+    leading = magnitude[:, None] < 10.0 ** np.arange(n_digits - 1, decimals, -1)
+
+    first = lead  # column of the most significant digit
+    fields = np.empty((len(values), first + n_digits + (1 if decimals else 0)), dtype=np.uint8)
+    fields[:, :first] = SPACE
+    fields[:, first:first + int_digits] = digits[:, :int_digits]
+    fields[:, first:first + int_digits - 1][leading] = SPACE
+    if decimals:
+        fields[:, first + int_digits] = POINT
+        fields[:, first + int_digits + 1:] = digits[:, int_digits:]
+    # Like printf, negative values that round to zero keep their sign
+    negative = np.nonzero(np.signbit(values))[0]
+    fields[negative, first - 1 + leading[negative].sum(axis=1)] = MINUS
+    return fields.reshape(shape + (fields.shape[1],))
+
+
+# Rows are assembled column block by column block into one byte buffer that is kept
+# and grown across chunks, then written straight from it.
+class _RowBuffer:
+
+    def __init__(self):
+        self.data = np.empty(0, dtype=np.uint8)
+
+    def rows(self, n_rows, row_width):
+        if len(self.data) < n_rows * row_width:
+            self.data = np.empty(n_rows * row_width, dtype=np.uint8)
+        return self.data[:n_rows * row_width].reshape(n_rows, row_width)
+
+
+def _join_fields(buffer, parts):
+    """Lay out fields (uint8 (N, w) arrays) and literal bytes side by side as rows."""
+    n_rows = next(len(part) for part in parts if not isinstance(part, bytes))
+    widths = [len(part) if isinstance(part, bytes) else part.shape[1] for part in parts]
+    rows = buffer.rows(n_rows, sum(widths))
+    column = 0
+    for part, width in zip(parts, widths):
+        rows[:, column:column + width] = np.frombuffer(part, dtype=np.uint8) if isinstance(part, bytes) else part
+        column += width
+    return rows
+
+
+class SegmentListWriter(ChunkWriter):
+    """Plain text, one segment per line: x1 y1 x2 y2 depth, fixed-point, space separated."""
+
+    def __init__(self, path, decimals=6):
+        super().__init__(path)
+        self.decimals = decimals
+        self.buffer = _RowBuffer()
+
+    def write(self, chunk):
+        written = 0
+        for start in range(0, len(chunk), FORMAT_BLOCK_ROWS):
+            block = chunk[start:start + FORMAT_BLOCK_ROWS]
+            # Two lead columns keep a blank between fields even before a minus sign
+            coordinates = format_fixed(block[:, :4], self.decimals, lead=2)
+            rows = _join_fields(self.buffer, [coordinates.reshape(len(block), -1),
+                                              format_fixed(block[:, 4], 0, lead=2), b'\n'])
+            self.file.write(memoryview(rows.reshape(-1)))
+            written += rows.size
+        return written
+
+
+# SVG with one <style> class per depth, so colors and stroke widths are emitted once
+# per depth rather than per segment. Every block of a chunk becomes one <path> per
+# depth present, deepest first as in render.rasterize. Path data needs no separator
+# before a blank or a sign, so the fixed-width fields go out as "Mx yLx y" per segment.
+# The y axis is flipped to point up. Strokes are in screen pixels (non-scaling), as in
+# the renderer.
+class SvgWriter(ChunkWriter):
+
+    def __init__(self, path, bbox, max_depth, width=1024, decimals=3, background=BACKGROUND):
+        super().__init__(path)
+        self.decimals = decimals
+        self.buffer = _RowBuffer()
+        xmin, ymin, xmax, ymax = bbox
+        height = max(1, round(width * (ymax - ymin) / max(xmax - xmin, 1e-12)))
+        colors, widths = depth_style(max_depth)
+        styles = ''.join(f'.d{depth}{{stroke:#{r:02x}{g:02x}{b:02x};stroke-width:{w}}}'
+                         for depth, ((r, g, b), w) in enumerate(zip(colors, widths)))
+        self.file.write((
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="{xmin!r} {-ymax!r} {xmax - xmin!r} {ymax - ymin!r}">\n'
+            f'<style>path{{fill:none;stroke-linecap:round;vector-effect:non-scaling-stroke}}{styles}</style>\n'
+            f'<rect x="{xmin!r}" y="{-ymax!r}" width="{xmax - xmin!r}" height="{ymax - ymin!r}" '
+            f'fill="#{background[0]:02x}{background[1]:02x}{background[2]:02x}"/>\n'
+        ).encode('ascii'))
+
+    def write(self, chunk):
+        depths = chunk[:, 4].astype(np.intp)
+        written = 0
+        for depth in np.unique(depths)[::-1]:
+            segments = chunk[depths == depth]
+            opening = f'<path class="d{depth}" d="'.encode('ascii')
+            self.file.write(opening)
+            for start in range(0, len(segments), FORMAT_BLOCK_ROWS):
+                block = segments[start:start + FORMAT_BLOCK_ROWS, :4] * (1.0, -1.0, 1.0, -1.0)
+                coordinates = format_fixed(block, self.decimals)
+                rows = _join_fields(self.buffer, [b'M', coordinates[:, 0], coordinates[:, 1],
+                                                  b'L', coordinates[:, 2], coordinates[:, 3]])
+                self.file.write(memoryview(rows.reshape(-1)))
+                written += rows.size
+            self.file.write(b'"/>\n')
+            written += len(opening) + 4
+        return written
+
+    def close(self):
+        self.file.write(b'</svg>\n')
+        super().close()
+
+
+def write_svg(path, branches, width=1024, decimals=3):
+    """Write in-memory (N, 5) rows as SVG, framed like render.render."""
+    max_depth = int(branches[:, 4].max()) if len(branches) > 0 else 0
+    with SvgWriter(path, tree_extent(branches), max_depth, width, decimals) as writer:
+        return writer.write(branches)
+
+
+def write_segments(path, branches, decimals=6):
+    """Write in-memory (N, 5) rows as a text segment list."""
+    with SegmentListWriter(path, decimals) as writer:
+        return writer.write(branches)
+
+
+def _stream_svg(path, parameters):
+    # The header is written before any row arrives, so the frame comes from tree_stats
+    stats = tree_stats(parameters)
+    xmin, ymin, xmax, ymax = stats['bbox'] or (0.0, 0.0, 1.0, 1.0)
+    pad = 0.02 * max(xmax - xmin, ymax - ymin)
+    return SvgWriter(path, (xmin - pad, ymin - pad, xmax + pad, ymax + pad), stats['max_depth'])
+
+
+# Tree file (see tree_file) written from a row stream. The header needs the per-depth
+# counts up front, which tree_stats gives analytically from `parameters`; every chunk
+# is then scattered to per-depth cursors, so rows of one depth keep their arrival
+# order. For the stream of iter_parallel* that is the order of
+# run_parallel*(grain=chunk_rows, output_path=...).
+class TreeFileWriter(ChunkWriter):
+
+    def __init__(self, path, parameters):
+        self.path = path
+        self.depth_offsets, _ = plan_levels([], [tree_stats(parameters)['depth_counts']])
+        data_offset = create_tree_file(path, self.depth_offsets, parameters)
+        self.rows = map_rows(path, data_offset, int(self.depth_offsets[-1]), mode='r+')
+        self.cursors = self.depth_offsets[:-1].copy()
+
+    def write(self, chunk):
+        write_levels(chunk, self.cursors, self.rows)
+        counts = np.bincount(chunk[:, 4].astype(np.intp), minlength=len(self.cursors))
+        self.cursors += counts
+        return chunk.nbytes
+
+    def close(self):
+        if isinstance(self.rows, np.memmap):
+            self.rows.flush()
+        self.rows = None
+        if not np.array_equal(self.cursors, self.depth_offsets[1:]):
+            raise RuntimeError("Exported rows do not match the tree's per-depth counts")
+
+    def __exit__(self, exc_type, *exc):
+        # An aborted export is incomplete by definition; don't mask its error with the count check
+        if exc_type is None:
+            self.close()
+        else:
+            self.rows = None
+
+
+EXPORT_FORMATS = {
+    'csv': lambda path, parameters: CsvWriter(path),
+    'raw': lambda path, parameters: RawWriter(path),
+    'tree': TreeFileWriter,
+    'svg': _stream_svg,
+    'segments': lambda path, parameters: SegmentListWriter(path),
+}
+
+
+def open_writer(path, export_format, parameters):
+    """Chunk writer for `export_format`; `parameters` as in result['parameters']."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return EXPORT_FORMATS[export_format](path, parameters)
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Parent offsets of LinkedBranches; row i's parent is row i - offset
+OFFSET_DTYPE = np.uint32
+
+
+# Implicit-topology branch storage. A branch starts where its parent ends, so x1, y1 of
+# an (N, 5) row repeat the parent's x2, y2, and depth follows from the tree's shape.
+# These layouts keep only the end points (16 bytes per branch instead of 40) plus
+# whatever the topology needs, and rebuild full rows on demand with to_array().
+
+# Symmetric tree in heap (BFS) order, the order of generate_fractal_tree_vectorized:
+# row i's parent is row (i - 1) // 2 and its depth is start_depth + floor(log2(i + 1)).
+# Row 0 starts at `origin`.
+class HeapBranches:
+
+    def __init__(self, x2, y2, origin, start_depth=0):
+        self.x2 = x2
+        self.y2 = y2
+        self.origin = origin
+        self.start_depth = start_depth
+
+    @classmethod
+    def from_array(cls, branches):
+        """Keep the end points of (N, 5) rows in heap order."""
+        origin = (float(branches[0, 0]), float(branches[0, 1])) if len(branches) > 0 else (0.0, 0.0)
+        start_depth = int(branches[0, 4]) if len(branches) > 0 else 0
+        return cls(branches[:, 2].copy(), branches[:, 3].copy(), origin, start_depth)
+
+    def __len__(self):
+        return len(self.x2)
+
+    @property
+    def nbytes(self):
+        return self.x2.nbytes + self.y2.nbytes
+
+    @property
+    def max_depth(self):
+        return self.start_depth + max(len(self).bit_length() - 1, 0)
+
+    def parents(self):
+        """Parent row of every row, -1 for the root."""
+        return (np.arange(len(self), dtype=np.int64) - 1) // 2
+
+    def depths(self):
+        # frexp(n) = (m, e) with n = m * 2^e, 0.5 <= m < 1, so floor(log2(n)) = e - 1
+        return self.start_depth + np.frexp(np.arange(1, len(self) + 1, dtype=np.float64))[1] - 1
+
+    def to_array(self):
+        """Expand to the (N, 5) float64 layout (x1, y1, x2, y2, depth)."""
+        return _expand(self.x2, self.y2, self.parents(), self.origin, self.depths())
+
+
+# Any tree in level (BFS) order with an explicit parent link per row, for the
+# asymmetric tree whose pruned levels break the heap arithmetic. Row i's parent is
+# row i - parent_offsets[i] (offset 0 marks the root), and `level_starts` holds the
+# first row of every depth level, which is all the depth column needs.
+class LinkedBranches:
+
+    def __init__(self, x2, y2, parent_offsets, level_starts, origin, start_depth=0):
+        self.x2 = x2
+        self.y2 = y2
+        self.parent_offsets = parent_offsets
+        self.level_starts = level_starts
+        self.origin = origin
+        self.start_depth = start_depth
+
+    @classmethod
+    def from_parents(cls, x2, y2, parents, level_starts, origin, start_depth=0):
+        """Build from absolute parent rows (-1 for the root)."""
+        if len(x2) > np.iinfo(OFFSET_DTYPE).max:
+            raise ValueError("Row count does not fit in uint32 parent offsets")
+        rows = np.arange(len(x2), dtype=np.int64)
+        offsets = np.where(parents < 0, 0, rows - parents).astype(OFFSET_DTYPE)
+        return cls(x2, y2, offsets, np.asarray(level_starts, dtype=np.int64), origin, start_depth)
+
+    def __len__(self):
+        return len(self.x2)
+
+    @property
+    def nbytes(self):
+        return self.x2.nbytes + self.y2.nbytes + self.parent_offsets.nbytes + self.level_starts.nbytes
+
+    @property
+    def max_depth(self):
+        return self.start_depth + max(len(self.level_starts) - 1, 0)
+
+    def parents(self):
+        """Parent row of every row, -1 for the root."""
+        parents = np.arange(len(self), dtype=np.int64) - self.parent_offsets
+        parents[self.parent_offsets == 0] = -1
+        return parents
+
+    def depths(self):
+        level_sizes = np.diff(np.append(self.level_starts, len(self)))
+        return self.start_depth + np.repeat(np.arange(len(self.level_starts)), level_sizes)
+
+    def to_array(self):
+        """Expand to the (N, 5) float64 layout (x1, y1, x2, y2, depth)."""
+        return _expand(self.x2, self.y2, self.parents(), self.origin, self.depths())
+
+
+def _expand(x2, y2, parents, origin, depths):
+    roots = parents < 0
+    parents = np.where(roots, 0, parents)
+    branches = np.empty((len(x2), 5), dtype=np.float64)
+    branches[:, 0] = np.where(roots, origin[0], x2[parents])
+    branches[:, 1] = np.where(roots, origin[1], y2[parents])
+    branches[:, 2] = x2
+    branches[:, 3] = y2
+    branches[:, 4] = depths
+    return branches
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import numpy as np
+
+# Rows transformed per batch, bounds the temporaries of the broadcast
+INSTANCE_BATCH_ROWS = 1 << 18
+
+
+def instance_subtree(out, canonical, xs, ys, cos_t, sin_t, depth_offset):
+    """Write one copy of `canonical` per root (xs[i], ys[i]) into `out`, rotated by the
+    angle whose cosine and sine are cos_t[i] and sin_t[i].
+
+    `canonical` is an (n, 5) subtree rooted at the origin; cos 1 and sin 0 only translate
+    it. `out` must hold len(xs) * n rows, filled copy after copy.
+    """
+    n = len(canonical)
+    if n == 0 or len(xs) == 0:
+        return
+    copies = out.reshape(len(xs), n, 5)
+    cos_t = np.asarray(cos_t)[:, None]
+    sin_t = np.asarray(sin_t)[:, None]
+    batch = max(1, INSTANCE_BATCH_ROWS // n)
+
+    for start in range(0, len(xs), batch):
+        rows = slice(start, start + batch)
+        c, s = cos_t[rows], sin_t[rows]
+        x0, y0 = xs[rows, None], ys[rows, None]
+        block = copies[rows]
+        block[:, :, 0] = x0 + c * canonical[:, 0] - s * canonical[:, 1]
+        block[:, :, 1] = y0 + s * canonical[:, 0] + c * canonical[:, 1]
+        block[:, :, 2] = x0 + c * canonical[:, 2] - s * canonical[:, 3]
+        block[:, :, 3] = y0 + s * canonical[:, 2] + c * canonical[:, 3]
+        block[:, :, 4] = canonical[:, 4] + depth_offset
+
+
+# LRU cache of read-only canonical subtrees bounded by their total size in bytes.
+class CanonicalCache:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, build):
+        """Cached subtree for `key`, built with build() on a miss."""
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        subtree = build()
+        subtree.flags.writeable = False
+        if subtree.nbytes <= self.max_bytes:
+            self._entries[key] = subtree
+            self.nbytes += subtree.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return subtree
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,58 @@
+import math
+
+# Subtasks per process targeted by grain='auto'
+TASKS_PER_PROCESS = 16
+
+
+def auto_grain(total_branches, num_processes):
+    return max(1, math.ceil(total_branches / (num_processes * TASKS_PER_PROCESS)))
+
+
+# Size-bounded alternative to cutting the tree at one uniform split_depth: a node is
+# expanded sequentially only while its analytic subtree size is above `grain`, so the
+# emitted subtasks are all at most `grain` branches regardless of how ragged the tree is.
+# With split_depth instead, every node at that depth becomes a subtask.
+#
+# Nodes are whatever places a branch in its tree - (length, net left turns) of a
+# symmetric branch, the (left_turns, right_turns) lattice cell of an asymmetric one:
+# subtree_size(node) -> exact branch count of the subtree rooted at `node`
+# branch(node) -> (length, cos, sin) of its root branch
+# children(node) -> [child_node, ...] in left-to-right order
+# visible(x, y, length) -> False for subtrees that can be skipped whole (optional)
+#
+# Directions come from the engines' angle tables, so the upper branches are
+# bit-identical to the rows an engine would produce for them. The tree is walked with
+# an explicit stack, so lopsided trees deeper than the recursion limit are fine. Upper
+# branches are appended to `upper_branches` in DFS pre-order and subtasks are returned
+# as (x, y, node, depth) in DFS order; empty subtrees are dropped.
+def partition_tree(x, y, node, depth, grain, subtree_size, branch, children, upper_branches,
+                   visible=None, split_depth=None):
+    tasks = []
+    stack = [(x, y, node, depth)]
+    while stack:
+        x, y, node, depth = stack.pop()
+        size = subtree_size(node)
+        if size == 0:
+            continue
+        length, cos_t, sin_t = branch(node)
+        if visible is not None and not visible(x, y, length):
+            continue
+        is_task = depth >= split_depth if split_depth is not None else size <= grain
+        if is_task:
+            tasks.append((x, y, node, depth))
+            continue
+
+        end_x = x + length * cos_t
+        end_y = y + length * sin_t
+        upper_branches.append((x, y, end_x, end_y, depth))
+        stack.extend(reversed([(end_x, end_y, child, depth + 1) for child in children(node)]))
+    return tasks
+
+
+def task_size_histogram(sizes):
+    """Number of subtasks per power-of-two size bucket, {bucket_start: count}."""
+    histogram = {}
+    for size in sizes:
+        bucket = 1 << (size.bit_length() - 1) if size > 0 else 0
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return dict(sorted(histogram.items()))
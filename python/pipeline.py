@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+
+# Chunks that may wait between the compute and write stages
+EXPORT_QUEUE_CHUNKS = 4
+# Rows per exported chunk unless chunk_rows / memory_budget say otherwise; small enough
+# that writing starts early and the queue stays a few MB
+EXPORT_CHUNK_ROWS = 1 << 16
+
+
+# Per-stage timing of one pipelined export.
+#   compute_time  time the producer waited for the next chunk from the generator
+#   stall_time    time the producer was blocked on a full queue (backpressure)
+#   write_time    time the writer spent encoding and writing
+class PipelineStats:
+
+    def __init__(self):
+        self.chunks = 0
+        self.rows = 0
+        self.bytes_written = 0
+        self.compute_time = 0.0
+        self.stall_time = 0.0
+        self.write_time = 0.0
+        self.wall_time = 0.0
+        self.max_queued = 0
+
+    def as_dict(self):
+        rate = lambda amount, seconds: amount / seconds if seconds > 0 else 0.0
+        return {
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'bytes_written': self.bytes_written,
+            'compute_time': self.compute_time,
+            'stall_time': self.stall_time,
+            'write_time': self.write_time,
+            'wall_time': self.wall_time,
+            'max_queued': self.max_queued,
+            'compute_rows_per_s': rate(self.rows, self.compute_time),
+            'write_rows_per_s': rate(self.rows, self.write_time),
+            'write_bytes_per_s': rate(self.bytes_written, self.write_time),
+            'rows_per_s': rate(self.rows, self.wall_time),
+        }
+
+
+_DONE = object()
+
+
+# Two-stage pipeline: this thread pulls chunks from `chunks` (typically a pool-backed
+# iterator, so generation runs in the workers) and hands them to a writer thread over
+# a queue of at most queue_chunks entries. File writes and numpy encoding release the
+# GIL, so writing overlaps generation; a full queue blocks the producer, so at most
+# queue_chunks chunks plus the generator's own window are ever held.
+def run_pipeline(chunks, writer, queue_chunks=EXPORT_QUEUE_CHUNKS):
+    stats = PipelineStats()
+    pending = queue.Queue(maxsize=queue_chunks)
+    failure = []
+
+    def write_stage():
+        while True:
+            chunk = pending.get()
+            if chunk is _DONE:
+                return
+            if failure:
+                continue  # drain so the producer never blocks on a dead writer
+            try:
+                start = time.perf_counter()
+                stats.bytes_written += writer.write(chunk)
+                stats.write_time += time.perf_counter() - start
+            except BaseException as exc:
+                failure.append(exc)
+
+    writer_thread = threading.Thread(target=write_stage, name='tree-writer', daemon=True)
+    start_time = time.perf_counter()
+    writer_thread.start()
+    try:
+        iterator = iter(chunks)
+        while not failure:
+            wait_start = time.perf_counter()
+            chunk = next(iterator, None)
+            stats.compute_time += time.perf_counter() - wait_start
+            if chunk is None:
+                break
+            stats.chunks += 1
+            stats.rows += len(chunk)
+            put_start = time.perf_counter()
+            pending.put(chunk)
+            stats.stall_time += time.perf_counter() - put_start
+            stats.max_queued = max(stats.max_queued, pending.qsize())
+    finally:
+        pending.put(_DONE)
+        writer_thread.join()
+        stats.wall_time = time.perf_counter() - start_time
+    if failure:
+        raise failure[0]
+    return stats
+
+
+def print_pipeline_stats(stats):
+    report = stats.as_dict()
+    print(f"Compute stage: {report['compute_time']:.6f}s waiting | {report['compute_rows_per_s']:,.0f} rows/s")
+    print(f"Write stage:   {report['write_time']:.6f}s busy | {report['write_rows_per_s']:,.0f} rows/s, "
+          f"{report['write_bytes_per_s'] / 1e6:,.1f} MB/s")
+    print(f"Pipeline:      {report['wall_time']:.6f}s wall | {report['rows_per_s']:,.0f} rows/s | "
+          f"backpressure {report['stall_time']:.6f}s | max queued {report['max_queued']}")
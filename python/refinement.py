@@ -0,0 +1,245 @@
+import math
+import numpy as np
+from contextlib import nullcontext
+from multiprocessing import Pool
+from angle_table import asymmetric_angle_table, symmetric_angle_table
+from asymmetric_sequential import _lattice_counts, _lattice_lengths
+from partition import TASKS_PER_PROCESS
+from symmetric_sequential import _count_levels
+
+
+# Incremental refinement. Lowering min_length only adds branches: every branch of the
+# coarser tree is still there, and the new ones all hang below the branches the old
+# cutoff pruned. A RefinableTree keeps those pruned branches as its frontier - each
+# starts at a leaf's end point and carries its length, turns and depth - so
+# refine(tree, min_length) grows only the frontier, level by level, and the rows it
+# already has are never regenerated or copied.
+#
+# turns are the net left turns (int) of a symmetric branch, or its (left_turns,
+# right_turns) lattice cell (int pair) in the asymmetric tree. Directions come from the
+# same angle tables and lengths from the same expressions as the vectorized engines,
+# so every row is bit-identical to theirs.
+class Frontier:
+
+    def __init__(self, x, y, lengths, turns, depths):
+        self.x = x
+        self.y = y
+        self.lengths = lengths
+        self.turns = turns
+        self.depths = depths
+
+    @classmethod
+    def concatenate(cls, frontiers):
+        return cls(*(np.concatenate(columns) for columns in zip(*(frontier.columns() for frontier in frontiers))))
+
+    def columns(self):
+        return self.x, self.y, self.lengths, self.turns, self.depths
+
+    def take(self, index):
+        return Frontier(*(column[index] for column in self.columns()))
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns())
+
+
+# Symmetric tree: both children are `ratio` times as long, one turn to either side.
+class _SymmetricRules:
+
+    def __init__(self, parameters, min_length):
+        self.ratio = parameters['ratio']
+        self.min_length = min_length
+        self.max_turns = _count_levels(parameters['trunk_length'], self.ratio, min_length)
+        self.table = symmetric_angle_table(math.pi / 2, math.radians(parameters['branch_angle']), self.max_turns)
+
+    def directions(self, turns):
+        return self.table.cos_array[turns + self.max_turns], self.table.sin_array[turns + self.max_turns]
+
+    def children(self, lengths, turns):
+        child_turns = np.empty(2 * len(turns), dtype=np.intp)
+        child_turns[0::2] = turns + 1
+        child_turns[1::2] = turns - 1
+        return np.repeat(lengths * self.ratio, 2), child_turns
+
+    def sizes(self, frontier):
+        # One length per depth, so a handful of distinct subtree sizes
+        unique, inverse = np.unique(frontier.lengths, return_inverse=True)
+        levels = [_count_levels(length, self.ratio, self.min_length) for length in unique]
+        return (2 ** np.array(levels, dtype=np.int64) - 1)[inverse]
+
+
+# Asymmetric tree: a left turn moves one lattice row down, a right turn one column over,
+# and the lattice gives every cell's length and subtree size.
+class _AsymmetricRules:
+
+    def __init__(self, parameters, min_length):
+        self.lengths = _lattice_lengths(parameters['trunk_length'], parameters['left_ratio'],
+                                        parameters['right_ratio'], min_length)
+        self.counts = _lattice_counts(self.lengths, min_length)
+        self.n_right = self.lengths.shape[1]
+        self.table = asymmetric_angle_table(math.pi / 2, math.radians(parameters['left_angle']),
+                                            math.radians(parameters['right_angle']), *self.lengths.shape)
+
+    def directions(self, turns):
+        cells = turns[:, 0] * self.n_right + turns[:, 1]
+        return self.table.cos_array[cells], self.table.sin_array[cells]
+
+    def children(self, lengths, turns):
+        child_turns = np.repeat(turns, 2, axis=0)
+        child_turns[0::2, 0] += 1
+        child_turns[1::2, 1] += 1
+        return self.lengths[child_turns[:, 0], child_turns[:, 1]], child_turns
+
+    def sizes(self, frontier):
+        return self.counts[frontier.turns[:, 0], frontier.turns[:, 1]]
+
+
+RULES = {
+    'symmetric': _SymmetricRules,
+    'asymmetric': _AsymmetricRules,
+}
+
+
+def _grow(frontier, rules, min_length):
+    """Expand every frontier branch of at least min_length, one level per step.
+
+    Returns the rows of every step and, per step, the branches left pending below
+    min_length. Children keep their parents' order, left before right.
+    """
+    steps, pending = [], []
+    level = frontier
+    while len(level) > 0:
+        ready = level.lengths >= min_length
+        pending.append(level.take(~ready))
+        level = level.take(ready)
+        if len(level) == 0:
+            break
+
+        cos_t, sin_t = rules.directions(level.turns)
+        end_x = level.x + level.lengths * cos_t
+        end_y = level.y + level.lengths * sin_t
+        rows = np.empty((len(level), 5), dtype=np.float64)
+        rows[:, 0] = level.x
+        rows[:, 1] = level.y
+        rows[:, 2] = end_x
+        rows[:, 3] = end_y
+        rows[:, 4] = level.depths
+        steps.append(rows)
+
+        child_lengths, child_turns = rules.children(level.lengths, level.turns)
+        level = Frontier(np.repeat(end_x, 2), np.repeat(end_y, 2), child_lengths, child_turns,
+                         np.repeat(level.depths + 1, 2))
+    return steps, pending
+
+
+def _grow_worker(args):
+    kind, parameters, min_length, frontier = args
+    return _grow(frontier, RULES[kind](parameters, min_length), min_length)
+
+
+def _split_frontier(frontier, sizes, n_slices):
+    # Contiguous slices of about equal work, so merging them step by step keeps the order
+    if len(frontier) == 0:
+        return [frontier]
+    work = np.cumsum(sizes + 1)
+    bounds = np.searchsorted(work, work[-1] * np.arange(1, n_slices) / n_slices)
+    edges = np.unique(np.concatenate([[0], bounds, [len(frontier)]]))
+    return [frontier.take(slice(start, stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def _step_major(parts):
+    """Step k of every slice, slice after slice, for k = 0, 1, ..."""
+    n_steps = max((len(part) for part in parts), default=0)
+    return [part[k] for k in range(n_steps) for part in parts if k < len(part)]
+
+
+# A tree that can be refined to a smaller min_length. Its rows are held as blocks - the
+# first tree grown, then the new rows of every refinement - which refine() shares with
+# the tree it returns instead of copying. The symmetric tree's rows are in heap (BFS)
+# order, exactly generate_fractal_tree_vectorized's, however many refinements built
+# them. An asymmetric refinement's new rows fall into every depth of the old tree, so
+# its block follows the old rows, level-synchronous from the frontier; together they
+# are the rows of generate_fractal_tree_asymmetric_vectorized, in another order.
+class RefinableTree:
+
+    def __init__(self, kind, parameters, blocks, frontier):
+        self.kind = kind
+        self.parameters = parameters
+        self.blocks = blocks
+        self.frontier = frontier
+
+    @property
+    def min_length(self):
+        return self.parameters['min_length']
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks)
+
+    @property
+    def nbytes(self):
+        return sum(block.nbytes for block in self.blocks) + self.frontier.nbytes
+
+    @property
+    def max_depth(self):
+        return max((int(block[:, 4].max()) for block in self.blocks if len(block) > 0), default=0)
+
+    def to_array(self):
+        """All rows as one (N, 5) float64 array (x1, y1, x2, y2, depth)."""
+        if not self.blocks:
+            return np.empty((0, 5), dtype=np.float64)
+        return np.concatenate(self.blocks)
+
+
+def refine(tree, min_length, num_processes=1, pool=None):
+    """`tree` extended to a smaller min_length, generating only the new branches.
+
+    With num_processes > 1 or a caller-owned pool, the frontier is cut into contiguous
+    slices of about equal work and grown across the pool; the rows are the same either
+    way. `tree` itself is left as it was.
+    """
+    if min_length > tree.min_length:
+        raise ValueError(f"refine only lowers min_length (tree has {tree.min_length}, asked for {min_length})")
+
+    if pool is None and num_processes == 1:
+        steps, pending = _grow(tree.frontier, RULES[tree.kind](tree.parameters, min_length), min_length)
+    else:
+        n_slices = (num_processes or 1) * TASKS_PER_PROCESS
+        sizes = RULES[tree.kind](tree.parameters, min_length).sizes(tree.frontier)
+        tasks = [(tree.kind, tree.parameters, min_length, part)
+                 for part in _split_frontier(tree.frontier, sizes, n_slices)]
+        with nullcontext(pool) if pool is not None else Pool(processes=num_processes) as active_pool:
+            parts = active_pool.map(_grow_worker, tasks)
+        steps = _step_major([part_steps for part_steps, _ in parts])
+        pending = _step_major([part_pending for _, part_pending in parts])
+
+    blocks = list(tree.blocks)
+    if steps:
+        blocks.append(np.concatenate(steps))
+    frontier = Frontier.concatenate(pending) if pending else tree.frontier.take(slice(0, 0))
+    return RefinableTree(tree.kind, {**tree.parameters, 'min_length': min_length}, blocks, frontier)
+
+
+def _seed(kind, parameters, trunk_length, turns):
+    # A tree with no rows yet whose frontier is the trunk
+    frontier = Frontier(np.zeros(1), np.zeros(1), np.array([trunk_length], dtype=np.float64),
+                        np.array(turns, dtype=np.intp), np.zeros(1, dtype=np.int64))
+    return RefinableTree(kind, {**parameters, 'min_length': math.inf}, [], frontier)
+
+
+def grow_tree(trunk_length=100.0, ratio=0.67, branch_angle=30.0, min_length=0.01, num_processes=1, pool=None):
+    """Refinable symmetric tree, trunk at the origin pointing up."""
+    seed = _seed('symmetric', {'trunk_length': trunk_length, 'ratio': ratio, 'branch_angle': branch_angle},
+                 trunk_length, [0])
+    return refine(seed, min_length, num_processes, pool)
+
+
+def grow_tree_asymmetric(trunk_length=100.0, left_ratio=0.67, right_ratio=0.57, left_angle=35.0, right_angle=25.0,
+                         min_length=0.01, num_processes=1, pool=None):
+    """Refinable asymmetric tree, trunk at the origin pointing up."""
+    seed = _seed('asymmetric', {'trunk_length': trunk_length, 'left_ratio': left_ratio, 'right_ratio': right_ratio,
+                                'left_angle': left_angle, 'right_angle': right_angle},
+                 trunk_length, [[0, 0]])
+    return refine(seed, min_length, num_processes, pool)
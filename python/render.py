@@ -0,0 +1,198 @@
+import math
+import struct
+import time
+import zlib
+from contextlib import nullcontext
+from multiprocessing import Pool, cpu_count
+import numpy as np
+from compact import CompactBranches
+from shared_output import SharedBranches
+from utils import print_header
+
+# Canvas tiles are squares of this many pixels (edge tiles may be smaller)
+TILE_SIZE = 256
+
+# Colors match the turtle scripts: dark background, green canopy
+BACKGROUND = (0x0f, 0x0f, 0x14)
+TRUNK_COLOR = (0x8b, 0x5a, 0x2b)
+LEAF_COLOR = (0xb4, 0xdc, 0x64)
+# Line width in pixels at depth 0, tapering to 1 at the deepest level
+MAX_WIDTH = 5
+
+
+def depth_style(max_depth, trunk_color=TRUNK_COLOR, leaf_color=LEAF_COLOR, max_width=MAX_WIDTH):
+    """Per-depth colors, (max_depth + 1, 3) uint8, and line widths, (max_depth + 1,) int."""
+    t = np.linspace(0.0, 1.0, max_depth + 1)
+    colors = np.rint(np.outer(1.0 - t, trunk_color) + np.outer(t, leaf_color)).astype(np.uint8)
+    widths = np.maximum(1, np.rint(max_width * (1.0 - t))).astype(np.intp)
+    return colors, widths
+
+
+def tree_extent(branches, margin=0.02):
+    """(xmin, ymin, xmax, ymax) of all branch end points, grown by `margin` of the larger side."""
+    if len(branches) == 0:
+        return 0.0, 0.0, 1.0, 1.0
+    xs = branches[:, [0, 2]]
+    ys = branches[:, [1, 3]]
+    xmin, ymin, xmax, ymax = float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+    pad = margin * max(xmax - xmin, ymax - ymin)
+    return xmin - pad, ymin - pad, xmax + pad, ymax + pad
+
+
+def to_pixels(branches, width, height, bbox):
+    """Map tree coordinates to pixel coordinates, fitting `bbox` into the canvas with a
+    uniform scale, centred, y pointing down. Depth is kept as the fifth column."""
+    xmin, ymin, xmax, ymax = bbox
+    scale = min(width / max(xmax - xmin, 1e-12), height / max(ymax - ymin, 1e-12))
+    offset_x = (width - (xmax - xmin) * scale) / 2
+    offset_y = (height - (ymax - ymin) * scale) / 2
+
+    pixels = np.empty((len(branches), 5), dtype=np.float64)
+    pixels[:, [0, 2]] = (branches[:, [0, 2]] - xmin) * scale + offset_x
+    pixels[:, [1, 3]] = height - ((branches[:, [1, 3]] - ymin) * scale + offset_y)
+    pixels[:, 4] = branches[:, 4]
+    return pixels
+
+
+def _sample_points(segments):
+    # Points along every segment at most one pixel apart, both end points included
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    counts = np.ceil(np.maximum(np.abs(dx), np.abs(dy))).astype(np.intp) + 1
+    owner = np.repeat(np.arange(len(segments)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(counts.sum()) - first) / np.repeat(np.maximum(counts - 1, 1), counts)
+    return segments[owner, 0] + t * dx[owner], segments[owner, 1] + t * dy[owner]
+
+
+def rasterize(image, segments, colors, widths, x0=0, y0=0):
+    """Draw pixel-space segments into `image` (h, w, 3), whose top-left pixel is (x0, y0).
+
+    Levels are drawn deepest first so that thicker, shallower branches end up on top.
+    A branch of width w is stamped as a w x w square at every sample point.
+    """
+    height, width = image.shape[:2]
+    depths = segments[:, 4].astype(np.intp)
+    for depth in np.unique(depths)[::-1]:
+        px, py = _sample_points(segments[depths == depth])
+        px = np.rint(px).astype(np.intp) - x0
+        py = np.rint(py).astype(np.intp) - y0
+        w = widths[depth]
+        for oy in range(-(w // 2), w - w // 2):
+            for ox in range(-(w // 2), w - w // 2):
+                xs, ys = px + ox, py + oy
+                inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+                image[ys[inside], xs[inside]] = colors[depth]
+
+
+def _render_tile(args):
+    name, n_rows, tile, colors, widths, background = args
+    x0, y0, x1, y1 = tile
+    pad = int(widths.max())
+    block = SharedBranches(n_rows, name=name)
+    try:
+        segments = block.array
+        lo_x = np.minimum(segments[:, 0], segments[:, 2])
+        hi_x = np.maximum(segments[:, 0], segments[:, 2])
+        lo_y = np.minimum(segments[:, 1], segments[:, 3])
+        hi_y = np.maximum(segments[:, 1], segments[:, 3])
+        # Only segments whose (padded) bounding box touches the tile are drawn here
+        touching = (hi_x >= x0 - pad) & (lo_x < x1 + pad) & (hi_y >= y0 - pad) & (lo_y < y1 + pad)
+        visible = segments[touching]
+        del segments
+    finally:
+        block.close()
+
+    image = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+    image[:] = background
+    rasterize(image, visible, colors, widths, x0, y0)
+    return tile, image
+
+
+def _tiles(width, height, tile_size):
+    return [(x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+            for y0 in range(0, height, tile_size)
+            for x0 in range(0, width, tile_size)]
+
+
+# Headless renderer for the (N, 5) rows of any engine (or CompactBranches).
+# The canvas is cut into tile_size tiles rendered by a process pool; the pixel-space
+# segments are shared with the workers through one shared memory block, and each
+# worker picks the segments that touch its tile. num_processes=1 renders in-process.
+def render(branches, width=1024, height=1024, bbox=None, num_processes=None, tile_size=TILE_SIZE,
+           pool=None, background=BACKGROUND, trunk_color=TRUNK_COLOR, leaf_color=LEAF_COLOR,
+           max_width=MAX_WIDTH):
+    if isinstance(branches, CompactBranches):
+        branches = branches.to_array()
+    if bbox is None:
+        bbox = tree_extent(branches)
+    if num_processes is None:
+        num_processes = cpu_count()
+
+    segments = to_pixels(branches, width, height, bbox)
+    max_depth = int(segments[:, 4].max()) if len(segments) > 0 else 0
+    colors, widths = depth_style(max_depth, trunk_color, leaf_color, max_width)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    if num_processes == 1 and pool is None:
+        image[:] = background
+        rasterize(image, segments, colors, widths)
+        return image
+
+    with SharedBranches(len(segments)) as shared:
+        shared.array[:] = segments
+        tasks = [(shared.name, len(segments), tile, colors, widths, background)
+                 for tile in _tiles(width, height, tile_size)]
+        with nullcontext(pool) if pool is not None else Pool(processes=num_processes) as active_pool:
+            for (x0, y0, x1, y1), tile_image in active_pool.imap_unordered(_render_tile, tasks):
+                image[y0:y1, x0:x1] = tile_image
+    return image
+
+
+def write_ppm(path, image):
+    """Write an (h, w, 3) uint8 image as binary PPM (P6)."""
+    height, width = image.shape[:2]
+    with open(path, 'wb') as f:
+        f.write(f'P6\n{width} {height}\n255\n'.encode('ascii'))
+        f.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def write_png(path, image):
+    """Write an (h, w, 3) uint8 image as an 8-bit RGB PNG, using only zlib."""
+    height, width = image.shape[:2]
+    # Every scanline starts with filter type 0 (None)
+    scanlines = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', header))
+        f.write(_png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def save_image(path, image):
+    """Write `image` as PNG or PPM, chosen by the file extension."""
+    if path.lower().endswith('.png'):
+        write_png(path, image)
+    elif path.lower().endswith('.ppm'):
+        write_ppm(path, image)
+    else:
+        raise ValueError(f"Unsupported image format: {path}")
+
+
+if __name__ == "__main__":
+
+    from symmetric_sequential import generate_fractal_tree_iterative
+
+    branches = generate_fractal_tree_iterative(0, 0, 100.0, math.pi / 2, 0.67, math.radians(30.0), 0.01)
+
+    print_header("Render (Python)")
+    start_time = time.perf_counter()
+    image = render(branches, width=2048, height=2048)
+    print(f"Render time: {time.perf_counter() - start_time:.6f}s | Branches: {len(branches):,}")
+    save_image('fractal_tree.png', image)
@@ -0,0 +1,64 @@
+from itertools import accumulate
+from multiprocessing import shared_memory
+import numpy as np
+
+ROW_BYTES = 5 * np.dtype(np.float64).itemsize
+
+
+# (N, 5) float64 branch array backed by a multiprocessing.shared_memory block.
+# The parent creates it sized by the analytic branch count; workers attach by name and
+# write their subtree rows in place, so nothing is pickled back through the Pool.
+class SharedBranches:
+
+    def __init__(self, n_rows, name=None):
+        self.n_rows = n_rows
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, n_rows * ROW_BYTES))
+        else:
+            self._shm = _attach(name)
+        self.array = np.ndarray((n_rows, 5), dtype=np.float64, buffer=self._shm.buf)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        # Views into the buffer must be gone before the mapping can be closed
+        self.array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(name):
+    # Only the creating process should track the block. Before Python 3.13 every attach
+    # registers it too, which is harmless as long as workers share the parent's resource
+    # tracker (see FractalTreeGenerator.start).
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def task_offsets(first_row, sizes):
+    """Output row offset of each task: prefix sum of subtask sizes after the upper rows."""
+    return list(accumulate(sizes[:-1], initial=first_row)) if sizes else []
+
+
+def write_shared(name, n_rows, offset, size, generate, *args, **kwargs):
+    """Attach to the shared block and let `generate` write `size` rows at `offset`."""
+    block = SharedBranches(n_rows, name=name)
+    try:
+        written = len(generate(*args, out=block.array[offset:offset + size], **kwargs))
+    finally:
+        block.close()
+    if written != size:
+        raise RuntimeError(f"Subtask wrote {written} rows, expected {size}")
+    return written
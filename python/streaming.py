@@ -0,0 +1,75 @@
+from collections import deque
+import numpy as np
+from shared_output import ROW_BYTES
+
+# Default bytes of rows the iterator APIs may hold at once, split evenly over the chunks
+# alive together (see resolve_chunk_rows); engine scratch space and the rows above the
+# grain-sized subtasks come on top
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+# Chunks alive besides the pieces being repacked: pack_chunks' buffer and the block the caller holds
+PACK_CHUNKS = 2
+# Rows per chunk for workers that reduce their subtree instead of returning it
+REDUCTION_CHUNK_ROWS = 1 << 18
+
+
+def resolve_chunk_rows(chunk_rows=None, memory_budget=None, live_chunks=1 + PACK_CHUNKS):
+    """Rows per yielded block: explicit chunk_rows, or the memory budget split over live_chunks blocks."""
+    if chunk_rows is None:
+        budget = memory_budget if memory_budget is not None else DEFAULT_MEMORY_BUDGET
+        chunk_rows = budget // (live_chunks * ROW_BYTES)
+    if chunk_rows < 1:
+        raise ValueError(f"Chunks must hold at least one row ({ROW_BYTES} bytes), got {chunk_rows} rows")
+    return chunk_rows
+
+
+# Lazily walks the tree in DFS pre-order with an explicit stack, so lopsided trees
+# deeper than the recursion limit are fine. Nodes whose subtree has more than `grain`
+# branches are yielded as single rows; smaller subtrees are handed whole to
+# generate_subtree(x, y, node, depth) and yielded as one piece. Nodes and the
+# subtree_size / branch / children callbacks are those of partition.partition_tree.
+def dfs_pieces(x, y, node, depth, grain, subtree_size, branch, children, generate_subtree):
+    stack = [(x, y, node, depth)]
+    while stack:
+        x, y, node, depth = stack.pop()
+        size = subtree_size(node)
+        if size == 0:
+            continue
+        if size <= grain:
+            yield generate_subtree(x, y, node, depth)
+            continue
+
+        length, cos_t, sin_t = branch(node)
+        end_x = x + length * cos_t
+        end_y = y + length * sin_t
+        yield np.array([(x, y, end_x, end_y, depth)], dtype=np.float64)
+        stack.extend(reversed([(end_x, end_y, child, depth + 1) for child in children(node)]))
+
+
+def pack_chunks(pieces, chunk_rows):
+    """Repack a stream of (n, 5) pieces into blocks of exactly chunk_rows rows (last may be shorter)."""
+    buffer = np.empty((chunk_rows, 5), dtype=np.float64)
+    fill = 0
+    for piece in pieces:
+        start = 0
+        while start < len(piece):
+            n = min(chunk_rows - fill, len(piece) - start)
+            buffer[fill:fill + n] = piece[start:start + n]
+            fill += n
+            start += n
+            if fill == chunk_rows:
+                yield buffer
+                buffer = np.empty((chunk_rows, 5), dtype=np.float64)
+                fill = 0
+    if fill:
+        yield buffer[:fill]
+
+
+def bounded_imap(pool, func, tasks, window):
+    """Ordered pool.imap with at most `window` tasks in flight, so unread results cannot pile up."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
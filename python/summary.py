@@ -0,0 +1,82 @@
+import numpy as np
+
+# What run_sequential* / run_parallel* hand back: every branch row, or only a TreeSummary
+COLLECT_MODES = ('rows', 'summary')
+
+
+def _add_padded(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    total = a.copy()
+    total[:len(b)] += b
+    return total
+
+
+# Reduction of a set of branch rows: count, bounding box, total length and per-depth
+# branch counts and lengths. Summaries of disjoint parts of a tree merge into the
+# summary of the whole, so workers can reduce their subtrees locally and only this
+# small object crosses the process boundary.
+class TreeSummary:
+
+    def __init__(self):
+        self.count = 0
+        self.total_length = 0.0
+        self.bbox = None
+        self.depth_counts = np.zeros(0, dtype=np.int64)
+        self.depth_lengths = np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        summary = cls()
+        for chunk in chunks:
+            summary.add(chunk)
+        return summary
+
+    @property
+    def max_depth(self):
+        return len(self.depth_counts) - 1 if self.count > 0 else 0
+
+    def add(self, branches):
+        """Fold (N, 5) rows into the summary."""
+        if len(branches) == 0:
+            return
+        lengths = np.hypot(branches[:, 2] - branches[:, 0], branches[:, 3] - branches[:, 1])
+        depths = branches[:, 4].astype(np.intp)
+        xs = branches[:, [0, 2]]
+        ys = branches[:, [1, 3]]
+
+        self.count += len(branches)
+        self.total_length += float(lengths.sum())
+        self._extend_bbox((float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())))
+        self.depth_counts = _add_padded(self.depth_counts, np.bincount(depths))
+        self.depth_lengths = _add_padded(self.depth_lengths, np.bincount(depths, weights=lengths))
+
+    def merge(self, other):
+        """Fold another summary into this one."""
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total_length += other.total_length
+        self._extend_bbox(other.bbox)
+        self.depth_counts = _add_padded(self.depth_counts, other.depth_counts)
+        self.depth_lengths = _add_padded(self.depth_lengths, other.depth_lengths)
+
+    def _extend_bbox(self, bbox):
+        if self.bbox is None:
+            self.bbox = bbox
+        else:
+            self.bbox = (min(self.bbox[0], bbox[0]), min(self.bbox[1], bbox[1]),
+                         max(self.bbox[2], bbox[2]), max(self.bbox[3], bbox[3]))
+
+    def __len__(self):
+        return self.count
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'max_depth': self.max_depth,
+            'bbox': self.bbox,
+            'total_length': self.total_length,
+            'depth_counts': self.depth_counts.tolist(),
+            'depth_lengths': self.depth_lengths.tolist(),
+        }
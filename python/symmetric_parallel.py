@@ -1,83 +1,248 @@
 import math
 import time
 import numpy as np
+from contextlib import nullcontext
+from itertools import chain
 from multiprocessing import Pool, cpu_count
-from symmetric_sequential import generate_fractal_tree
-from utils import print_header, print_params, print_result
+from symmetric_sequential import (_TurnNodes, _count_levels, _count_symmetric, generate_fractal_tree_heap,
+                                  iter_fractal_tree, select_engine)
+from compact import CompactBranches, generate_compact
+from cost_model import auto_split_depth_symmetric
+from culling import disc_intersects, effective_min_length, subtree_radius, translate_bbox, tree_bounds
+from density import DENSITY_WEIGHTS, accumulate_chunks, grid_shape
+from exporters import open_writer
+from partition import auto_grain, partition_tree, task_size_histogram
+from pipeline import EXPORT_CHUNK_ROWS, EXPORT_QUEUE_CHUNKS, print_pipeline_stats, run_pipeline
+from shared_output import SharedBranches, task_offsets, write_shared
+from streaming import PACK_CHUNKS, REDUCTION_CHUNK_ROWS, bounded_imap, pack_chunks, resolve_chunk_rows
+from summary import COLLECT_MODES, TreeSummary
+from tree_file import create_tree_file, plan_levels, write_file_rows
+from utils import print_header, print_params, print_result, print_task_histogram
 
 
 def _worker(args):
-    x, y, length, angle, ratio, branch_angle_rad, min_length, depth = args
-    return generate_fractal_tree(x, y, length, angle, ratio, branch_angle_rad, min_length, start_depth=depth)
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = args
+    return select_engine(engine, bbox)(x, y, length, angle, ratio, branch_angle_rad, min_length,
+                                       start_depth=depth, turn=turn)
 
 
-def _build_tasks(x, y, length, angle, ratio, branch_angle_rad, min_length, depth, target_depth, upper_branches):
-    if depth >= target_depth:
-        return [(x, y, length, angle, ratio, branch_angle_rad, min_length, depth)]
+def _compact_worker(args):
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = args
+    # generate_compact builds the subtree around a local origin, so the bbox moves with it
+    local_bbox = translate_bbox(bbox, -x, -y) if bbox is not None else None
+    return generate_compact(select_engine(engine, local_bbox), x, y, length, angle, ratio, branch_angle_rad,
+                            min_length, start_depth=depth, turn=turn)
 
-    end_x = x + length * math.cos(angle)
-    end_y = y + length * math.sin(angle)
-    upper_branches.append((x, y, end_x, end_y, depth))
 
-    new_len = length * ratio
-    left = _build_tasks(end_x, end_y, new_len, angle + branch_angle_rad, ratio, branch_angle_rad, min_length, depth + 1, target_depth, upper_branches)
-    right = _build_tasks(end_x, end_y, new_len, angle - branch_angle_rad, ratio, branch_angle_rad, min_length, depth + 1, target_depth, upper_branches)
-    return left + right
+# Heap layout: only end points cross the process boundary. The layout fixes the row
+# order, so `engine` is not used
+def _implicit_worker(args):
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = args
+    return generate_fractal_tree_heap(x, y, length, angle, ratio, branch_angle_rad, min_length, start_depth=depth,
+                                      turn=turn)
+
+
+def _shared_worker(args):
+    task, shm_name, n_rows, offset, size = args
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = task
+    return write_shared(shm_name, n_rows, offset, size, select_engine(engine, bbox),
+                        x, y, length, angle, ratio, branch_angle_rad, min_length, start_depth=depth, turn=turn)
+
+
+# Maps the tree file and writes the subtree at its planned per-depth offsets. Rows are
+# stable-sorted by depth, so the engine's left-to-right order within a depth is kept
+def _file_worker(args):
+    task, path, data_offset, n_rows, level_offsets = args
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = task
+    rows = select_engine(engine)(x, y, length, angle, ratio, branch_angle_rad, min_length, start_depth=depth,
+                                 turn=turn)
+    return write_file_rows(path, data_offset, n_rows, level_offsets, rows)
+
+
+# Rows of one task as a stream of chunks, for workers that reduce them on the fly
+def _task_chunks(task):
+    x, y, length, angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox = task
+    if bbox is None:
+        return iter_fractal_tree(x, y, length, angle, ratio, branch_angle_rad, min_length, start_depth=depth,
+                                 chunk_rows=REDUCTION_CHUNK_ROWS, engine=engine, turn=turn)
+    return [select_engine(engine, bbox)(x, y, length, angle, ratio, branch_angle_rad, min_length,
+                                        start_depth=depth, turn=turn)]
+
+
+def _density_worker(args):
+    task, shape, grid_bbox, weight = args
+    return accumulate_chunks(_task_chunks(task), shape, grid_bbox, weight)
+
+
+def _summary_worker(task):
+    return TreeSummary.from_chunks(_task_chunks(task))
+
+
+# A caller-owned pool (see tree_generator.FractalTreeGenerator) is reused as is;
+# otherwise a fresh one lives for this call only.
+def _pool_scope(pool, num_processes):
+    return nullcontext(pool) if pool is not None else Pool(processes=num_processes)
+
+
+# Tasks are cut from the trunk's tree: each carries the length and net left turns of
+# its root, so workers look up the same angle table entries as a sequential run and
+# the rows come out bit-identical whatever the split. Subtrees that cannot reach the
+# bbox are neither expanded nor dispatched. Nodes are split while their subtree is
+# larger than `grain`, or else down to split_depth.
+def _build_tasks(trunk_length, ratio, branch_angle_rad, min_length, engine, bbox=None, grain=None,
+                 split_depth=None):
+    start_angle = math.pi / 2
+    nodes = _TurnNodes(trunk_length, start_angle, ratio, branch_angle_rad, min_length)
+    visible = None
+    if bbox is not None:
+        visible = lambda x, y, length: disc_intersects(x, y, subtree_radius(length, ratio), bbox)
+    upper_branches = []
+    roots = partition_tree(0, 0, nodes.root, 0, grain, nodes.subtree_size, nodes.branch, nodes.children,
+                           upper_branches, visible, split_depth)
+    tasks = [(x, y, length, start_angle, ratio, branch_angle_rad, min_length, depth, turn, engine, bbox)
+             for x, y, (length, turn), depth in roots]
+    return tasks, upper_branches
 
 
 def run_parallel(trunk_length=100.0, ratio=0.67, branch_angle=30.0,
-                        min_length=0.01, num_processes=None, split_depth=None):
+                        min_length=0.01, num_processes=None, split_depth=None,
+                        engine='iterative', shared_output=False, pool=None,
+                        grain=None, compact=False, bbox=None, pixel_size=None,
+                        density=None, grid_size=512, collect='rows', implicit=False, output_path=None):
 
     if num_processes is None:
         num_processes = cpu_count()
+    if compact and shared_output:
+        raise ValueError("compact rows cannot be written to shared_output")
+    if bbox is not None and shared_output:
+        raise ValueError("bbox-culled rows cannot be written to shared_output")
+    if density is not None and density not in DENSITY_WEIGHTS:
+        raise ValueError(f"Unknown density weight: {density}")
+    if density is not None and (compact or shared_output):
+        raise ValueError("density mode returns a grid, not rows; it excludes compact and shared_output")
+    if collect not in COLLECT_MODES:
+        raise ValueError(f"Unknown collect mode: {collect}")
+    if collect == 'summary' and (compact or shared_output or density is not None):
+        raise ValueError("collect='summary' returns no rows; it excludes compact, shared_output and density")
+    if implicit and (compact or shared_output or bbox is not None or density is not None or collect != 'rows'):
+        raise ValueError("implicit layout needs whole subtrees returned as rows; it excludes compact, shared_output, "
+                         "bbox, density and collect='summary'")
+    if output_path is not None and (compact or shared_output or implicit or bbox is not None or density is not None
+                                    or collect != 'rows'):
+        raise ValueError("output_path writes whole subtrees as rows; it excludes compact, shared_output, implicit, "
+                         "bbox, density and collect='summary'")
+    if output_path is not None and engine == 'instanced':
+        raise ValueError("output_path stores each depth's rows left to right; the instanced engine emits them "
+                         "subtree copy by subtree copy")
 
     branch_angle_rad = math.radians(branch_angle)
-    if split_depth is None:
+    generate_min_length = effective_min_length(min_length, pixel_size)
+    if grain == 'auto':
+        grain = auto_grain(_count_symmetric(trunk_length, ratio, generate_min_length), num_processes)
+    if grain is not None:
+        split_depth = None
+    elif split_depth is None:
         split_depth = max(1, math.ceil(math.log2(num_processes * 4)))
+    elif split_depth == 'auto':
+        split_depth = auto_split_depth_symmetric(trunk_length, ratio, generate_min_length, num_processes,
+                                                 engine, shared_output, pool)
 
     print_header("Parallel (Python)")
     print_params(trunk_length, ratio, branch_angle, min_length,
-                 cores=num_processes, split_depth=split_depth)
+                 cores=num_processes, split_depth=split_depth, engine=engine,
+                 shared_output=shared_output, grain=grain, compact=compact, bbox=bbox,
+                 pixel_size=pixel_size, density=density, collect=collect, implicit=implicit,
+                 output_path=output_path)
 
     start_time = time.perf_counter()
 
-    # Build upper levels sequentially
-    start_x, start_y = 0, 0
-    start_angle = math.pi / 2
-    end_x = start_x + trunk_length * math.cos(start_angle)
-    end_y = start_y + trunk_length * math.sin(start_angle)
-    start_depth = 0
-
-    upper_branches = [(start_x, start_y, end_x, end_y, start_depth)]
-    new_len = trunk_length * ratio
-    left_child_angle_rad = start_angle + branch_angle_rad
-    right_child_angle_rad = start_angle - branch_angle_rad
-
-    # left subtree
-    tasks = _build_tasks(end_x, end_y, 
-                         new_len, left_child_angle_rad,
-                         ratio, branch_angle_rad, 
-                         min_length, 1, 
-                         split_depth, upper_branches)
-    
-    # right subtree
-    tasks += _build_tasks(end_x, end_y, 
-                          new_len, right_child_angle_rad,
-                          ratio, branch_angle_rad, 
-                          min_length, 1, 
-                          split_depth, upper_branches)
-
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(_worker, tasks)
-
-    upper_array = np.array(upper_branches, dtype=np.float64)
-    branches = np.concatenate([upper_array] + results)
+    # The trunk is always an upper branch, so uniform tasks start at depth 1 at the earliest
+    task_depth = max(split_depth, 1) if grain is None else None
+    tasks, upper_branches = _build_tasks(trunk_length, ratio, branch_angle_rad, generate_min_length, engine, bbox,
+                                         grain, task_depth)
+
+    upper_array = np.array(upper_branches, dtype=np.float64).reshape(-1, 5)
+    # Unculled subtree sizes; with a bbox they are upper bounds
+    sizes = [_count_symmetric(task[2], ratio, generate_min_length) for task in tasks]
+
+    if density is not None:
+        # Reduction mode: workers return partial grids that are summed here, the rows
+        # never leave the workers. The grid covers the bbox, or else the whole tree
+        grid_bbox = bbox if bbox is not None else tree_bounds(trunk_length, ratio)
+        shape = grid_shape(grid_size)
+        grid, total_branches, max_depth = accumulate_chunks([upper_array], shape, grid_bbox, density)
+        density_tasks = [(task, shape, grid_bbox, density) for task in tasks]
+        with _pool_scope(pool, num_processes) as active_pool:
+            for partial_grid, n_branches, task_depth in active_pool.imap_unordered(_density_worker,
+                                                                                   density_tasks):
+                grid += partial_grid
+                total_branches += n_branches
+                max_depth = max(max_depth, task_depth)
+    elif collect == 'summary':
+        # Workers reduce their subtrees to TreeSummary objects; no rows cross the pool
+        summary = TreeSummary.from_chunks([upper_array])
+        with _pool_scope(pool, num_processes) as active_pool:
+            for part in active_pool.imap_unordered(_summary_worker, tasks):
+                summary.merge(part)
+    elif output_path is not None:
+        # Workers map the file and write their subtrees depth-major at planned offsets;
+        # the rows never gather in this process
+        task_depth_counts = [[0] * task[7] + [2 ** level for level in range(_count_levels(task[2], ratio,
+                                                                                           generate_min_length))]
+                             for task in tasks]
+        depth_offsets, task_level_offsets = plan_levels(upper_array[:, 4], task_depth_counts)
+        total_branches = int(depth_offsets[-1])
+        max_depth = max(len(depth_offsets) - 2, 0)
+        data_offset = create_tree_file(output_path, depth_offsets, {
+            'trunk_length': trunk_length,
+            'ratio': ratio,
+            'branch_angle': branch_angle,
+            'min_length': min_length,
+            'pixel_size': pixel_size,
+        })
+        write_file_rows(output_path, data_offset, total_branches, depth_offsets[:-1], upper_array)
+        file_tasks = [(task, output_path, data_offset, total_branches, level_offsets)
+                      for task, level_offsets in zip(tasks, task_level_offsets)]
+        with _pool_scope(pool, num_processes) as active_pool:
+            active_pool.map(_file_worker, file_tasks)
+    elif shared_output:
+        # Workers write straight into one preallocated block at precomputed offsets. The
+        # block is released on the way out, whether or not a worker failed
+        offsets = task_offsets(len(upper_array), sizes)
+        with SharedBranches(len(upper_array) + sum(sizes)) as output:
+            output.array[:len(upper_array)] = upper_array
+            shared_tasks = [(task, output.name, output.n_rows, offset, size)
+                            for task, offset, size in zip(tasks, offsets, sizes)]
+            with _pool_scope(pool, num_processes) as active_pool:
+                active_pool.map(_shared_worker, shared_tasks)
+            total_branches = output.n_rows
+            max_depth = int(output.array[:, 4].max()) if total_branches > 0 else 0
+    elif implicit:
+        # Workers return heap-layout end points, 16 instead of 40 bytes a branch; rows are rebuilt here
+        with _pool_scope(pool, num_processes) as active_pool:
+            results = active_pool.map(_implicit_worker, tasks)
+        branches = np.concatenate([upper_array] + [part.to_array() for part in results])
+    elif compact:
+        with _pool_scope(pool, num_processes) as active_pool:
+            results = active_pool.map(_compact_worker, tasks)
+        branches = CompactBranches.concatenate([CompactBranches.from_array(upper_array)] + results)
+    else:
+        with _pool_scope(pool, num_processes) as active_pool:
+            results = active_pool.map(_worker, tasks)
+        branches = np.concatenate([upper_array] + results)
 
     execution_time = time.perf_counter() - start_time
 
-    total_branches = len(branches)
-    max_depth = int(branches[:, 4].max()) if total_branches > 0 else 0
+    if collect == 'summary':
+        total_branches, max_depth = summary.count, summary.max_depth
+    elif density is None and output_path is None and not shared_output:
+        total_branches = len(branches)
+        depths = branches.depth if compact else branches[:, 4]
+        max_depth = int(depths.max()) if total_branches > 0 else 0
     print_result(execution_time, total_branches, max_depth)
+    task_histogram = task_size_histogram(sizes)
+    if grain is not None:
+        print_task_histogram(task_histogram)
 
     result = {
         'parameters': {
@@ -87,13 +252,97 @@ def run_parallel(trunk_length=100.0, ratio=0.67, branch_angle=30.0,
             'min_length': min_length,
             'split_depth': split_depth,
             'num_processes': num_processes,
+            'engine': engine,
+            'shared_output': shared_output,
+            'grain': grain,
+            'compact': compact,
+            'bbox': bbox,
+            'pixel_size': pixel_size,
+            'density': density,
+            'grid_size': grid_size,
+            'collect': collect,
+            'implicit': implicit,
+            'output_path': output_path,
         },
         'execution_time': execution_time,
+        'num_tasks': len(tasks),
+        'task_histogram': task_histogram,
     }
+    if density is not None:
+        result['density'] = grid
+        result['density_bbox'] = grid_bbox
+    if collect == 'summary':
+        result['summary'] = summary.as_dict()
 
     return result
 
 
+# Streams the tree as (chunk_rows, 5) blocks: the rows and order of
+# run_parallel(grain=chunk_rows), with at most two subtasks per process in flight.
+def iter_parallel(trunk_length=100.0, ratio=0.67, branch_angle=30.0, min_length=0.01,
+                  num_processes=None, chunk_rows=None, memory_budget=None, engine='iterative', pool=None):
+
+    if num_processes is None:
+        num_processes = cpu_count()
+    # Up to `window` subtask results of at most chunk_rows rows each are alive at once,
+    # besides the packing buffer and the block last yielded
+    window = 2 * num_processes
+    chunk_rows = resolve_chunk_rows(chunk_rows, memory_budget, window + PACK_CHUNKS)
+
+    tasks, upper_branches = _build_tasks(trunk_length, ratio, math.radians(branch_angle), min_length, engine,
+                                         grain=chunk_rows)
+    # Only the chain holds the upper rows, so they are freed once repacked
+    upper = iter([np.array(upper_branches, dtype=np.float64).reshape(-1, 5)])
+    del upper_branches
+    with _pool_scope(pool, num_processes) as active_pool:
+        results = bounded_imap(active_pool, _worker, tasks, window)
+        yield from pack_chunks(chain(upper, results), chunk_rows)
+
+
+# Pipelined export: the chunks of iter_parallel are encoded and written by a writer
+# thread while the pool keeps generating, so the run takes about max(compute, I/O)
+# instead of their sum. Memory stays bounded by the generator's window plus
+# queue_chunks chunks. export_format is one of exporters.EXPORT_FORMATS.
+def export_parallel(path, export_format='tree', trunk_length=100.0, ratio=0.67, branch_angle=30.0,
+                    min_length=0.01, num_processes=None, chunk_rows=None, memory_budget=None,
+                    engine='iterative', pool=None, queue_chunks=EXPORT_QUEUE_CHUNKS):
+
+    if num_processes is None:
+        num_processes = cpu_count()
+    if export_format == 'tree' and engine == 'instanced':
+        raise ValueError("tree files store each depth's rows left to right; the instanced engine emits them "
+                         "subtree copy by subtree copy")
+    if chunk_rows is None and memory_budget is None:
+        chunk_rows = EXPORT_CHUNK_ROWS
+    # The generator's window and blocks, the queued chunks and the one being written
+    live_chunks = 2 * num_processes + PACK_CHUNKS + queue_chunks + 1
+    chunk_rows = resolve_chunk_rows(chunk_rows, memory_budget, live_chunks)
+    tree_parameters = {
+        'trunk_length': trunk_length,
+        'ratio': ratio,
+        'branch_angle': branch_angle,
+        'min_length': min_length,
+    }
+
+    print_header("Parallel Export (Python)")
+    print_params(trunk_length, ratio, branch_angle, min_length,
+                 cores=num_processes, engine=engine, path=path, export_format=export_format,
+                 chunk_rows=chunk_rows, queue_chunks=queue_chunks)
+
+    with open_writer(path, export_format, tree_parameters) as writer:
+        chunks = iter_parallel(trunk_length, ratio, branch_angle, min_length, num_processes=num_processes,
+                               chunk_rows=chunk_rows, engine=engine, pool=pool)
+        stats = run_pipeline(chunks, writer, queue_chunks)
+    print_pipeline_stats(stats)
+
+    return {
+        'parameters': dict(tree_parameters, num_processes=num_processes, engine=engine, path=path,
+                           export_format=export_format, chunk_rows=chunk_rows, queue_chunks=queue_chunks),
+        'execution_time': stats.wall_time,
+        'pipeline': stats.as_dict(),
+    }
+
+
 if __name__ == "__main__":
 
     run_parallel(
@@ -1,59 +1,422 @@
 import math
 import time
 import numpy as np
+from functools import lru_cache, partial
+from angle_table import symmetric_angle_table
+from compact import generate_compact
+from culling import cull_tree, effective_min_length
+from implicit_layout import HeapBranches
+from instancing import instance_subtree
+from streaming import REDUCTION_CHUNK_ROWS, dfs_pieces, pack_chunks, resolve_chunk_rows
+from summary import COLLECT_MODES, TreeSummary
 from utils import print_header, print_params, print_result
 
+
+def _count_levels(length, ratio, min_length):
+    """Number of depth levels, using the same repeated multiplication as the generators."""
+    num_levels = 0
+    while length >= min_length:
+        num_levels += 1
+        length *= ratio
+    return num_levels
+
+
+def _count_symmetric(length, ratio, min_length):
+    """Exact branch count of a symmetric (sub)tree."""
+    return 2 ** _count_levels(length, ratio, min_length) - 1
+
+
+# Entry k of every table is angle + k * branch_angle, whatever its size, so the table of
+# a subtree agrees bit for bit with the whole tree's wherever they overlap
+def _turn_table(angle, branch_angle_radians, num_levels, turn):
+    """Angle table for a subtree of num_levels levels whose root has `turn` net left turns,
+    and the root's index into it."""
+    max_turns = num_levels + abs(turn)
+    return symmetric_angle_table(angle, branch_angle_radians, max_turns), max_turns + turn
+
+
+# Nodes of the partition / streaming / culling walkers: (length, net left turns).
+# Lengths are multiplied per level and directions looked up in the angle table, as in
+# the engines, so the rows the walkers emit are bit-identical to generated ones.
+class _TurnNodes:
+
+    def __init__(self, length, angle, ratio, branch_angle_radians, min_length, turn=0):
+        self.ratio = ratio
+        self.min_length = min_length
+        self.table, root = _turn_table(angle, branch_angle_radians, _count_levels(length, ratio, min_length), turn)
+        self.offset = root - turn
+        self.root = (length, turn)
+
+    def subtree_size(self, node):
+        return _count_symmetric(node[0], self.ratio, self.min_length)
+
+    def branch(self, node):
+        length, turn = node
+        return length, self.table.cos[turn + self.offset], self.table.sin[turn + self.offset]
+
+    def children(self, node):
+        length, turn = node
+        return [(length * self.ratio, turn + 1), (length * self.ratio, turn - 1)]
+
+
+def _recurse(branches, idx, x, y, length, turn, depth, ratio, min_length, cos_t, sin_t):
+    """Write the subtree in DFS pre-order from branches[idx]; returns the next free row."""
+    if length < min_length:
+        return idx
+    end_x = x + length * cos_t[turn]
+    end_y = y + length * sin_t[turn]
+    branches[idx] = (x, y, end_x, end_y, depth)
+    new_length = length * ratio
+    idx = _recurse(branches, idx + 1, end_x, end_y, new_length, turn + 1, depth + 1, ratio, min_length, cos_t, sin_t)
+    return _recurse(branches, idx, end_x, end_y, new_length, turn - 1, depth + 1, ratio, min_length, cos_t, sin_t)
+
+
 # Returns numpy array of shape (N, 5) with columns (x1, y1, x2, y2, depth).
-def generate_fractal_tree(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0):
+# If `out` is given, rows are written into it instead of a fresh array.
+# Branches carry the net number of left turns as an index into a precomputed angle
+# table, so the recursion itself does no trig. `angle` is the direction of a branch with
+# no net turns and `turn` the root's own net left turns, so a subtree cut from a larger
+# tree (as the parallel runners do) has the very same directions as in the whole tree.
+def generate_fractal_tree(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0,
+                          out=None, turn=0):
     if length < min_length:
         return np.empty((0, 5), dtype=np.float64)
 
-    max_depth = math.floor(math.log(min_length / length) / math.log(ratio))
-    branches = np.empty((2 ** (max_depth + 1) - 1, 5), dtype=np.float64)
+    num_levels = _count_levels(length, ratio, min_length)
+    if out is None:
+        branches = np.empty((2 ** num_levels - 1, 5), dtype=np.float64)
+    else:
+        branches = out
+    table, root = _turn_table(angle, branch_angle_radians, num_levels, turn)
+    idx = _recurse(branches, 0, x, y, length, root, start_depth, ratio, min_length, table.cos, table.sin)
+    return branches[:idx]
+
+
+# Rows buffered as tuples by the iterative kernel before one slice assignment
+ROW_FLUSH = 4096
+
+
+# Iterative variant of generate_fractal_tree with the same DFS pre-order rows and no
+# recursion limit. It walks down the left spine and keeps the pending right siblings
+# on a preallocated stack of (x, y, length, turn, depth) records - at most one per
+# level - so there is no Python frame per branch.
+def generate_fractal_tree_iterative(x, y, length, angle, ratio, branch_angle_radians, min_length,
+                                    start_depth=0, out=None, turn=0):
+    if length < min_length:
+        return np.empty((0, 5), dtype=np.float64)
+
+    num_levels = _count_levels(length, ratio, min_length)
+    if out is None:
+        branches = np.empty((2 ** num_levels - 1, 5), dtype=np.float64)
+    else:
+        branches = out
+    table, turn = _turn_table(angle, branch_angle_radians, num_levels, turn)
+    cos_t, sin_t = table.cos, table.sin
+    stack = [None] * num_levels
+    top = 0
+    rows = []
     idx = 0
+    depth = start_depth
+
+    while True:
+        end_x = x + length * cos_t[turn]
+        end_y = y + length * sin_t[turn]
+        rows.append((x, y, end_x, end_y, depth))
+        length *= ratio
+        if length >= min_length:
+            stack[top] = (end_x, end_y, length, turn - 1, depth + 1)
+            top += 1
+            x, y, turn, depth = end_x, end_y, turn + 1, depth + 1
+            continue
+        if len(rows) >= ROW_FLUSH or not top:
+            branches[idx:idx + len(rows)] = rows
+            idx += len(rows)
+            rows.clear()
+        if not top:
+            break
+        top -= 1
+        x, y, length, turn, depth = stack[top]
 
-    def recurse(x, y, length, angle, depth):
-        nonlocal idx
-        if length < min_length:
-            return
-        end_x = x + length * math.cos(angle)
-        end_y = y + length * math.sin(angle)
-        branches[idx] = (x, y, end_x, end_y, depth)
-        idx += 1
-        new_length = length * ratio
-        recurse(end_x, end_y, new_length, angle + branch_angle_radians, depth + 1)
-        recurse(end_x, end_y, new_length, angle - branch_angle_radians, depth + 1)
-
-    recurse(x, y, length, angle, start_depth)
     return branches[:idx]
 
 
+# Writes `num_levels` depth levels breadth-first into branches[:2**num_levels - 1] and
+# returns the next frontier as (xs, ys, cos, sin, length).
+def _expand_levels(branches, x, y, length, angle, ratio, branch_angle_radians, num_levels, start_depth, turn=0):
+    table, root = _turn_table(angle, branch_angle_radians, num_levels, turn)
+    xs = np.array([x], dtype=np.float64)
+    ys = np.array([y], dtype=np.float64)
+    turns = np.array([root], dtype=np.intp)
+    level_length = length
+    offset = 0
+
+    for level in range(num_levels):
+        n = len(turns)
+        end_x = xs + level_length * table.cos_array[turns]
+        end_y = ys + level_length * table.sin_array[turns]
+
+        block = branches[offset:offset + n]
+        block[:, 0] = xs
+        block[:, 1] = ys
+        block[:, 2] = end_x
+        block[:, 3] = end_y
+        block[:, 4] = start_depth + level
+        offset += n
+
+        # Left child at even, right child at odd positions of the next frontier
+        xs = np.repeat(end_x, 2)
+        ys = np.repeat(end_y, 2)
+        child_turns = np.empty(2 * n, dtype=np.intp)
+        child_turns[0::2] = turns + 1
+        child_turns[1::2] = turns - 1
+        turns = child_turns
+        level_length *= ratio
+
+    return xs, ys, table.cos_array[turns], table.sin_array[turns], level_length
+
+
+# Breadth-first variant: expands a whole depth level per step with array operations.
+# Rows are in heap (BFS) order - children of row i are rows 2i+1 (left) and 2i+2 (right).
+def generate_fractal_tree_vectorized(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0,
+                                    out=None, turn=0):
+    num_levels = _count_levels(length, ratio, min_length)
+    if out is None:
+        branches = np.empty((2 ** num_levels - 1, 5), dtype=np.float64)
+    else:
+        branches = out
+    _expand_levels(branches, x, y, length, angle, ratio, branch_angle_radians, num_levels, start_depth, turn)
+    return branches
+
+
+# Random access into the heap (BFS) order of generate_fractal_tree_vectorized. Branch i
+# sits at depth floor(log2(i + 1)), and the bits of i + 1 below the leading one spell
+# its path from the root (0 = left, 1 = right). All indices walk their paths together,
+# one level per step, so a lookup costs O(depth) array operations and the rows come out
+# bit-identical to the generated ones.
+def branch_at(indices, x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0):
+    num_levels = _count_levels(length, ratio, min_length)
+    indices = np.atleast_1d(np.asarray(indices, dtype=np.int64))
+    n_branches = 2 ** num_levels - 1
+    if indices.size > 0 and (indices.min() < 0 or indices.max() >= n_branches):
+        raise IndexError(f"Branch index out of range for a tree of {n_branches:,} branches")
+
+    table = symmetric_angle_table(angle, branch_angle_radians, num_levels)
+    heap = indices + 1
+    depths = np.zeros(len(heap), dtype=np.int64)
+    for level in range(1, num_levels):
+        depths += heap >= (1 << level)
+
+    xs = np.full(len(heap), x, dtype=np.float64)
+    ys = np.full(len(heap), y, dtype=np.float64)
+    turns = np.full(len(heap), num_levels, dtype=np.intp)
+    level_length = length
+    for level in range(int(depths.max(initial=0))):
+        below = depths > level
+        right = (heap >> np.maximum(depths - level - 1, 0)) & 1
+        xs = np.where(below, xs + level_length * table.cos_array[turns], xs)
+        ys = np.where(below, ys + level_length * table.sin_array[turns], ys)
+        turns = np.where(below, turns + 1 - 2 * right, turns)
+        level_length *= ratio
+
+    level_lengths = [length]
+    for _ in range(1, num_levels):
+        level_lengths.append(level_lengths[-1] * ratio)
+    branch_lengths = np.array(level_lengths, dtype=np.float64)[depths]
+
+    branches = np.empty((len(heap), 5), dtype=np.float64)
+    branches[:, 0] = xs
+    branches[:, 1] = ys
+    branches[:, 2] = xs + branch_lengths * table.cos_array[turns]
+    branches[:, 3] = ys + branch_lengths * table.sin_array[turns]
+    branches[:, 4] = start_depth + depths
+    return branches
+
+
+# Heap-layout variant of the vectorized engine: the same level-by-level expansion, but
+# only end points are stored; start points and depths are implicit in the heap order.
+def generate_fractal_tree_heap(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0,
+                               turn=0):
+    num_levels = _count_levels(length, ratio, min_length)
+    table, root = _turn_table(angle, branch_angle_radians, num_levels, turn)
+    x2 = np.empty(2 ** num_levels - 1, dtype=np.float64)
+    y2 = np.empty(2 ** num_levels - 1, dtype=np.float64)
+    xs = np.array([x], dtype=np.float64)
+    ys = np.array([y], dtype=np.float64)
+    turns = np.array([root], dtype=np.intp)
+    level_length = length
+    offset = 0
+
+    for level in range(num_levels):
+        n = len(turns)
+        end_x = x2[offset:offset + n]
+        end_y = y2[offset:offset + n]
+        np.add(xs, level_length * table.cos_array[turns], out=end_x)
+        np.add(ys, level_length * table.sin_array[turns], out=end_y)
+        offset += n
+
+        xs = np.repeat(end_x, 2)
+        ys = np.repeat(end_y, 2)
+        child_turns = np.empty(2 * n, dtype=np.intp)
+        child_turns[0::2] = turns + 1
+        child_turns[1::2] = turns - 1
+        turns = child_turns
+        level_length *= ratio
+
+    return HeapBranches(x2, y2, (x, y), start_depth)
+
+
+# Largest canonical subtree the instancing engine builds and keeps cached
+MAX_CANONICAL_ROWS = 1 << 16
+
+
+@lru_cache(maxsize=16)
+def _canonical_subtree(length, ratio, branch_angle_radians, min_length):
+    """Subtree rooted at the origin pointing along +x, depths counted from 0. Read-only, cached."""
+    canonical = generate_fractal_tree_vectorized(0.0, 0.0, length, 0.0, ratio, branch_angle_radians, min_length)
+    canonical.flags.writeable = False
+    return canonical
+
+
+# Instancing variant: every subtree rooted at the same depth is the same shape up to
+# rotation and translation. The upper levels are expanded breadth-first until the
+# remaining subtrees have at most MAX_CANONICAL_ROWS branches; one canonical copy of
+# that subtree is generated (and cached per process), and every frontier node gets a
+# rotated and translated copy of it - a 2x2 rotation plus offset instead of trig per branch.
+# Rows: upper levels in BFS order, then one block per frontier node.
+def generate_fractal_tree_instanced(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0,
+                                   out=None, turn=0):
+    num_levels = _count_levels(length, ratio, min_length)
+    if out is None:
+        branches = np.empty((2 ** num_levels - 1, 5), dtype=np.float64)
+    else:
+        branches = out
+
+    split = 0
+    while split < num_levels and 2 ** (num_levels - split) - 1 > MAX_CANONICAL_ROWS:
+        split += 1
+    xs, ys, cos_t, sin_t, split_length = _expand_levels(branches, x, y, length, angle, ratio,
+                                                        branch_angle_radians, split, start_depth, turn)
+    if split == num_levels:
+        return branches
+
+    canonical = _canonical_subtree(split_length, ratio, branch_angle_radians, min_length)
+    instance_subtree(branches[2 ** split - 1:], canonical, xs, ys, cos_t, sin_t, start_depth + split)
+    return branches
+
+
+ENGINES = {
+    'recursive': generate_fractal_tree,
+    'iterative': generate_fractal_tree_iterative,
+    'vectorized': generate_fractal_tree_vectorized,
+    'instanced': generate_fractal_tree_instanced,
+}
+
+
+# Viewport-culled generation: only subtrees whose bounding disc meets
+# bbox = (xmin, ymin, xmax, ymax) are built. Rows: the branches straddling the bbox
+# edge in DFS pre-order, then every subtree lying wholly inside it, built by `engine`.
+def generate_fractal_tree_culled(x, y, length, angle, ratio, branch_angle_radians, min_length, bbox,
+                                 start_depth=0, engine='iterative', turn=0):
+    nodes = _TurnNodes(length, angle, ratio, branch_angle_radians, min_length, turn)
+    rows, roots = cull_tree(x, y, nodes.root, start_depth, bbox, ratio, min_length, nodes.branch, nodes.children)
+    generate = ENGINES[engine]
+    pieces = [np.array(rows, dtype=np.float64).reshape(-1, 5)]
+    pieces += [generate(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=depth, turn=turn)
+               for x, y, (length, turn), depth in roots]
+    return np.concatenate(pieces)
+
+
+def select_engine(engine, bbox=None):
+    """Generator function for `engine`, culled to `bbox` when one is given."""
+    if bbox is None:
+        return ENGINES[engine]
+    return partial(generate_fractal_tree_culled, bbox=bbox, engine=engine)
+
+
+# Yields the tree as (chunk_rows, 5) blocks in DFS order without materializing it.
+# chunk_rows defaults to what fits in memory_budget bytes; a tree that fits in one
+# chunk is generated in one piece. Subtrees of at most chunk_rows branches are
+# generated whole by `engine` (the vectorized engine orders rows level by level
+# inside each of them).
+def iter_fractal_tree(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=0,
+                      chunk_rows=None, memory_budget=None, engine='iterative', turn=0):
+    chunk_rows = resolve_chunk_rows(chunk_rows, memory_budget)
+    generate = ENGINES[engine]
+    total = _count_symmetric(length, ratio, min_length)
+    if total == 0:
+        return
+    if total <= chunk_rows:
+        yield generate(x, y, length, angle, ratio, branch_angle_radians, min_length, start_depth=start_depth,
+                       turn=turn)
+        return
+
+    nodes = _TurnNodes(length, angle, ratio, branch_angle_radians, min_length, turn)
+    pieces = dfs_pieces(
+        x, y, nodes.root, start_depth, chunk_rows, nodes.subtree_size, nodes.branch, nodes.children,
+        lambda x, y, node, depth: generate(x, y, node[0], angle, ratio, branch_angle_radians, min_length,
+                                           start_depth=depth, turn=node[1]),
+    )
+    yield from pack_chunks(pieces, chunk_rows)
+
+
 def run_sequential(trunk_length=100.0, ratio=0.67, branch_angle=30.0,
-                   min_length=1.0):
+                   min_length=1.0, engine='iterative', compact=False, bbox=None, pixel_size=None,
+                   collect='rows'):
+
+    if collect not in COLLECT_MODES:
+        raise ValueError(f"Unknown collect mode: {collect}")
+    if collect == 'summary' and compact:
+        raise ValueError("collect='summary' returns no rows; it excludes compact")
 
     branch_angle_radians = math.radians(branch_angle)
+    generate_min_length = effective_min_length(min_length, pixel_size)
+    generate = select_engine(engine, bbox)
+    if compact:
+        generate = partial(generate_compact, generate)
 
     print_header("Sequential (Python)")
-    print_params(trunk_length, ratio, branch_angle, min_length)
+    print_params(trunk_length, ratio, branch_angle, min_length, engine=engine,
+                 compact=compact, bbox=bbox, pixel_size=pixel_size, collect=collect)
 
     start_time = time.perf_counter()
-    branches = generate_fractal_tree(
-        0, 0, trunk_length, math.pi / 2, ratio, branch_angle_radians, min_length
-    )
+    if collect == 'summary':
+        # Same chunked reduction as the parallel workers, the tree is never materialized
+        if bbox is None:
+            chunks = iter_fractal_tree(0, 0, trunk_length, math.pi / 2, ratio, branch_angle_radians,
+                                       generate_min_length, chunk_rows=REDUCTION_CHUNK_ROWS, engine=engine)
+        else:
+            chunks = [generate(0, 0, trunk_length, math.pi / 2, ratio, branch_angle_radians, generate_min_length)]
+        summary = TreeSummary.from_chunks(chunks)
+    else:
+        branches = generate(
+            0, 0, trunk_length, math.pi / 2, ratio, branch_angle_radians, generate_min_length
+        )
     execution_time = time.perf_counter() - start_time
 
-    max_depth = int(branches[:, 4].max()) if len(branches) > 0 else 0
-    print_result(execution_time, len(branches), max_depth)
+    if collect == 'summary':
+        total_branches, max_depth = summary.count, summary.max_depth
+    else:
+        total_branches = len(branches)
+        depths = branches.depth if compact else branches[:, 4]
+        max_depth = int(depths.max()) if total_branches > 0 else 0
+    print_result(execution_time, total_branches, max_depth)
 
     result = {
         'parameters': {
             'trunk_length': trunk_length,
             'ratio': ratio,
             'branch_angle': branch_angle,
-            'min_length': min_length
+            'min_length': min_length,
+            'engine': engine,
+            'compact': compact,
+            'bbox': bbox,
+            'pixel_size': pixel_size,
+            'collect': collect,
         },
         'execution_time': execution_time,
     }
+    if collect == 'summary':
+        result['summary'] = summary.as_dict()
 
     return result
 
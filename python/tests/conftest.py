@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live flat in python/, as the experiments import them
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
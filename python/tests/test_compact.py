@@ -0,0 +1,48 @@
+import math
+import numpy as np
+from asymmetric_sequential import generate_fractal_tree_asymmetric_iterative
+from compact import CompactBranches, generate_compact
+from symmetric_sequential import generate_fractal_tree_iterative, generate_fractal_tree_vectorized
+
+SYMMETRIC_ARGS = (100.0, math.pi / 2, 0.67, math.radians(30.0), 0.05)
+ASYMMETRIC_ARGS = (100.0, math.pi / 2, 0.67, 0.57, math.radians(35.0), math.radians(25.0), 0.01)
+# Relative length error of a float32 offset MAX_OFFSET_RATIO branch lengths long, with margin
+MAX_RELATIVE_ERROR = 2e-5
+
+
+def _lengths(rows):
+    return np.hypot(rows[:, 2] - rows[:, 0], rows[:, 3] - rows[:, 1])
+
+
+def _leaf_relative_error(compact, expected):
+    leaves = expected[:, 4] == expected[:, 4].max()
+    restored = compact.to_array()
+    assert np.array_equal(restored[:, 4], expected[:, 4])
+    return np.max(np.abs(_lengths(restored[leaves]) - _lengths(expected[leaves])) / _lengths(expected[leaves]))
+
+
+def test_symmetric_leaf_lengths():
+    for generate in (generate_fractal_tree_iterative, generate_fractal_tree_vectorized):
+        expected = generate(0.0, 0.0, *SYMMETRIC_ARGS)
+        compact = generate_compact(generate, 0.0, 0.0, *SYMMETRIC_ARGS)
+        assert _leaf_relative_error(compact, expected) < MAX_RELATIVE_ERROR
+
+
+def test_asymmetric_leaf_lengths_away_from_origin():
+    expected = generate_fractal_tree_asymmetric_iterative(250.0, -40.0, *ASYMMETRIC_ARGS)
+    compact = generate_compact(generate_fractal_tree_asymmetric_iterative, 250.0, -40.0, *ASYMMETRIC_ARGS)
+    assert _leaf_relative_error(compact, expected) < MAX_RELATIVE_ERROR
+
+
+def test_concatenated_parts_keep_precision():
+    expected = generate_fractal_tree_iterative(0.0, 0.0, *SYMMETRIC_ARGS)
+    half = len(expected) // 2
+    compact = CompactBranches.concatenate([CompactBranches.from_array(expected[:half]),
+                                           CompactBranches.from_array(expected[half:])])
+    assert _leaf_relative_error(compact, expected) < MAX_RELATIVE_ERROR
+
+
+def test_empty_tree():
+    compact = CompactBranches.from_array(np.empty((0, 5), dtype=np.float64))
+    assert len(compact) == 0
+    assert compact.to_array().shape == (0, 5)
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import math
+import sys
+import numpy as np
+from asymmetric_parallel import iter_parallel_asymmetric, run_parallel_asymmetric
+from asymmetric_sequential import generate_fractal_tree_asymmetric_iterative, iter_fractal_tree_asymmetric
+from shared_output import ROW_BYTES
+from streaming import PACK_CHUNKS
+from tree_file import open_tree, write_tree
+
+# A left spine of ratio 0.995 runs about 1,060 levels deep before 0.5, past the default
+# recursion limit; the 0.01 right ratio keeps the tree itself small
+LEFT_RATIO, RIGHT_RATIO = 0.995, 0.01
+MIN_LENGTH = 0.5
+ARGS = (0, 0, 100.0, math.pi / 2, LEFT_RATIO, RIGHT_RATIO, math.radians(35.0), math.radians(25.0), MIN_LENGTH)
+
+
+def test_tree_is_deeper_than_recursion_limit():
+    branches = generate_fractal_tree_asymmetric_iterative(*ARGS)
+    assert branches[:, 4].max() > sys.getrecursionlimit()
+
+
+def test_iter_fractal_tree_asymmetric_small_chunks():
+    expected = generate_fractal_tree_asymmetric_iterative(*ARGS)
+    chunks = list(iter_fractal_tree_asymmetric(*ARGS, chunk_rows=100))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert np.array_equal(np.concatenate(chunks), expected)
+
+
+def test_iter_parallel_asymmetric_splits_the_budget_over_live_chunks():
+    expected = generate_fractal_tree_asymmetric_iterative(*ARGS)
+    # Two processes keep four subtask results in flight besides the packing buffer and the yielded block
+    budget = (4 + PACK_CHUNKS) * 100 * ROW_BYTES
+    chunks = list(iter_parallel_asymmetric(left_ratio=LEFT_RATIO, right_ratio=RIGHT_RATIO, min_length=MIN_LENGTH,
+                                           num_processes=2, memory_budget=budget))
+    assert max(len(chunk) for chunk in chunks) == 100
+    assert sum(len(chunk) for chunk in chunks) == len(expected)
+
+
+def test_run_parallel_asymmetric_small_grain():
+    expected = generate_fractal_tree_asymmetric_iterative(*ARGS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_parallel_asymmetric(left_ratio=LEFT_RATIO, right_ratio=RIGHT_RATIO, min_length=MIN_LENGTH,
+                                         grain=50, num_processes=2, collect='summary')
+    assert result['summary']['count'] == len(expected)
+    assert result['summary']['max_depth'] == int(expected[:, 4].max())
+
+
+def test_tree_file_does_not_depend_on_split_depth(tmp_path):
+    expected = tmp_path / 'sequential.tree'
+    write_tree(str(expected), generate_fractal_tree_asymmetric_iterative(*ARGS))
+    for split_depth in (1, 4, 9):
+        path = tmp_path / f'split{split_depth}.tree'
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_parallel_asymmetric(left_ratio=LEFT_RATIO, right_ratio=RIGHT_RATIO, min_length=MIN_LENGTH,
+                                    split_depth=split_depth, num_processes=2, output_path=str(path))
+        with open_tree(str(path)) as tree, open_tree(str(expected)) as reference:
+            assert np.array_equal(np.asarray(tree.branches), np.asarray(reference.branches))
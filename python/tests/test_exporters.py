@@ -0,0 +1,13 @@
+import numpy as np
+from exporters import format_fixed
+
+# Halves that the scaled float64 puts on the wrong side, exact ties, and negatives rounding to zero
+VALUES = np.array([-0.0005, -99.9995, 0.0005, 0.125, 0.375, 2.5, -0.0004, -0.0, 0.0, 12345.6785])
+
+
+def test_format_fixed_matches_printf():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([VALUES, np.round(rng.uniform(-1000, 1000, 10_000), 4)])
+    for decimals in (0, 3, 6):
+        fields = format_fixed(values, decimals)
+        assert [bytes(field).decode().strip() for field in fields] == ['%.*f' % (decimals, v) for v in values]
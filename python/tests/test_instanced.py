@@ -0,0 +1,45 @@
+import contextlib
+import io
+import math
+import numpy as np
+import pytest
+from asymmetric_parallel import run_parallel_asymmetric
+from asymmetric_sequential import (_lattice_lengths, generate_fractal_tree_asymmetric_instanced,
+                                   generate_fractal_tree_asymmetric_iterative)
+
+# min_length equal to the length of lattice cell (2, 4): branches sit exactly on the cutoff
+LEFT_RATIO, RIGHT_RATIO = 0.67, 0.57
+MIN_LENGTH = float(_lattice_lengths(100.0, LEFT_RATIO, RIGHT_RATIO, 1.0)[2, 4])
+ARGS = (0, 0, 100.0, math.pi / 2, LEFT_RATIO, RIGHT_RATIO, math.radians(35.0), math.radians(25.0), MIN_LENGTH)
+
+
+def _count(**kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_parallel_asymmetric(left_ratio=LEFT_RATIO, right_ratio=RIGHT_RATIO, min_length=MIN_LENGTH,
+                                         split_depth=5, num_processes=2, collect='summary', **kwargs)
+    return result['summary']['count']
+
+
+def test_instanced_matches_iterative_at_a_lattice_length():
+    expected = generate_fractal_tree_asymmetric_iterative(*ARGS)
+    instanced = generate_fractal_tree_asymmetric_instanced(*ARGS)
+    assert len(instanced) == len(expected)
+    order = lambda rows: rows[np.lexsort(rows.T[::-1])]
+    assert np.allclose(order(instanced), order(expected), rtol=0, atol=1e-9)
+
+    assert _count(engine='instanced') == _count(engine='iterative') == len(expected)
+
+
+def test_instanced_fills_shared_output_at_a_lattice_length():
+    for schedule in ('static', 'lpt'):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            run_parallel_asymmetric(left_ratio=LEFT_RATIO, right_ratio=RIGHT_RATIO, min_length=MIN_LENGTH,
+                                    split_depth=5, num_processes=2, engine='instanced', shared_output=True,
+                                    schedule=schedule)
+        assert f"Branches: {len(generate_fractal_tree_asymmetric_iterative(*ARGS)):,}" in output.getvalue()
+
+
+def test_instanced_cannot_write_tree_files(tmp_path):
+    with pytest.raises(ValueError):
+        run_parallel_asymmetric(min_length=MIN_LENGTH, num_processes=1, engine='instanced',
+                                output_path=str(tmp_path / 'tree'))
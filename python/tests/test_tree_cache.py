@@ -0,0 +1,60 @@
+import contextlib
+import io
+import math
+import numpy as np
+from symmetric_sequential import generate_fractal_tree_iterative
+from tree_cache import TreeCache
+from tree_file import TreeFile
+
+
+def _quiet(call, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return call(**kwargs)
+
+
+def test_run_parallel_miss_and_hit_match(tmp_path):
+    cache = TreeCache(str(tmp_path))
+    kwargs = dict(min_length=0.5, ratio=0.6, num_processes=1)
+    miss = _quiet(cache.run_parallel, **kwargs)
+    hit = _quiet(cache.run_parallel, **kwargs)
+
+    assert (miss['cache'], hit['cache']) == ('miss', 'hit')
+    assert miss.keys() == hit.keys()
+    assert miss['parameters'] == hit['parameters']
+    assert isinstance(miss['tree'], TreeFile) and isinstance(hit['tree'], TreeFile)
+    assert miss['tree'].depth_offsets == hit['tree'].depth_offsets
+    assert np.array_equal(np.asarray(miss['tree'].branches), np.asarray(hit['tree'].branches))
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_run_parallel_asymmetric_miss_and_hit_match(tmp_path):
+    cache = TreeCache(str(tmp_path))
+    miss = _quiet(cache.run_parallel_asymmetric, min_length=0.5, num_processes=1)
+    hit = _quiet(cache.run_parallel_asymmetric, min_length=0.5, num_processes=1, engine='vectorized')
+    assert (miss['cache'], hit['cache']) == ('miss', 'hit')
+    assert miss.keys() == hit.keys()
+    assert np.array_equal(np.asarray(miss['tree'].branches), np.asarray(hit['tree'].branches))
+
+
+def test_tree_files_do_not_depend_on_engine_or_split_depth(tmp_path):
+    # Engine and split depth are left out of the cache key; files written by separate
+    # caches with different ones must be the same
+    runs = [('iterative', 2), ('recursive', 5), ('vectorized', 7)]
+    trees = []
+    for engine, split_depth in runs:
+        cache = TreeCache(str(tmp_path / engine))
+        result = _quiet(cache.run_parallel_asymmetric, min_length=0.5, num_processes=2, engine=engine,
+                        split_depth=split_depth)
+        assert result['cache'] == 'miss'
+        trees.append(np.asarray(result['tree'].branches))
+    assert all(np.array_equal(tree, trees[0]) for tree in trees[1:])
+
+
+def test_generate_miss_and_hit_match(tmp_path):
+    cache = TreeCache(str(tmp_path))
+    args = (0, 0, 100.0, math.pi / 2, 0.67, math.radians(30.0), 0.5)
+    miss = cache.generate(generate_fractal_tree_iterative, *args)
+    hit = cache.generate(generate_fractal_tree_iterative, *args)
+    assert type(miss) is type(hit)
+    assert np.array_equal(miss, hit)
+    assert np.array_equal(hit, generate_fractal_tree_iterative(*args))
@@ -0,0 +1,194 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from multiprocessing import cpu_count
+import numpy as np
+from asymmetric_parallel import run_parallel_asymmetric
+from symmetric_parallel import run_parallel
+from tree_file import FORMAT_VERSION, open_tree
+from utils import print_header, print_result
+
+# Bump whenever an engine's output changes, so stale entries stop matching
+ENGINE_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'fractal_tree')
+DEFAULT_CACHE_BYTES = 4 * 1024 ** 3
+
+ENTRY_SUFFIXES = ('.npy', '.ftree')
+
+# Arguments of run_parallel* that decide the content of the tree file they write.
+# Tasks are cut in the trunk's frame, so every split depth and pool size yields the
+# same rows bit for bit, and every engine allowed to write a tree file emits each
+# depth left to right (the instanced engines are rejected, see tree_file). The
+# tests compare files written independently with different engines and split depths.
+# Grain-bounded tasks do change the order within a depth, so grain is part of the key.
+_TREE_KEYS = {
+    run_parallel: ('trunk_length', 'ratio', 'branch_angle', 'min_length', 'pixel_size', 'grain'),
+    run_parallel_asymmetric: ('trunk_length', 'left_ratio', 'right_ratio', 'left_angle', 'right_angle',
+                              'min_length', 'pixel_size', 'grain'),
+}
+
+
+def _canonical(value):
+    # 100 and 100.0 generate the same tree, so every number is keyed as a float
+    if isinstance(value, (bool, np.bool_)) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    if isinstance(value, (tuple, list)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    raise TypeError(f"Cannot key a cache entry on {type(value).__name__}")
+
+
+def cache_key(kind, parameters):
+    """Hex SHA-256 of the canonical JSON of kind, parameters and the engine/format versions."""
+    payload = json.dumps({
+        'kind': kind,
+        'parameters': _canonical(parameters),
+        'engine_version': ENGINE_VERSION,
+        'format_version': FORMAT_VERSION,
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Content-addressed on-disk cache of generated trees. Entries are memory-mapped on a
+# hit, so opening one costs milliseconds whatever its size:
+#   generate(engine, *args)     rows of any generate_fractal_tree* engine, as .npy,
+#                               returned as a read-only memmap in the engine's row order
+#   run_parallel*(**kwargs)     the tree file run_parallel*(output_path=...) writes,
+#                               returned as result['tree'], a tree_file.TreeFile, on
+#                               a hit and a miss alike
+# The directory is bounded by max_bytes with LRU eviction; an entry's mtime is its
+# last use, so the cache needs no index and survives concurrent readers.
+class TreeCache:
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.hit_bytes = 0
+        self.stored_bytes = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def generate(self, generate, *args, **kwargs):
+        """Rows of generate(*args, **kwargs), from the cache when present."""
+        if kwargs.get('out') is not None:
+            return generate(*args, **kwargs)
+        kind = f'{generate.__module__}.{generate.__qualname__}'
+        path = self._path(cache_key(kind, {'args': args, 'kwargs': kwargs}), '.npy')
+        if self._hit(path):
+            return np.load(path, mmap_mode='r')
+
+        def write(tmp):
+            with open(tmp, 'wb') as f:
+                np.save(f, generate(*args, **kwargs))
+
+        self._store(path, write)
+        branches = np.load(path, mmap_mode='r')
+        self._evict(keep=path)
+        return branches
+
+    def run_parallel(self, **kwargs):
+        return self._run(run_parallel, kwargs)
+
+    def run_parallel_asymmetric(self, **kwargs):
+        return self._run(run_parallel_asymmetric, kwargs)
+
+    def _run(self, run, kwargs):
+        bound = inspect.signature(run).bind(**kwargs)
+        bound.apply_defaults()
+        content = {key: bound.arguments[key] for key in _TREE_KEYS[run]}
+        if content['grain'] == 'auto':
+            # The resolved grain depends on the pool size
+            content['num_processes'] = bound.arguments['num_processes'] or cpu_count()
+        path = self._path(cache_key(run.__name__, content), '.ftree')
+
+        # Hit or miss, the result has the same keys: the parameters the entry is keyed
+        # on, the time to produce it, 'hit' or 'miss', and the entry as a TreeFile
+        start_time = time.perf_counter()
+        if self._hit(path):
+            cache = 'hit'
+            tree = open_tree(path)
+            execution_time = time.perf_counter() - start_time
+            print_header("Tree Cache Hit (Python)")
+            print_result(execution_time, len(tree), tree.max_depth)
+        else:
+            cache = 'miss'
+            self._store(path, lambda tmp: run(output_path=tmp, **kwargs))
+            tree = open_tree(path)
+            execution_time = time.perf_counter() - start_time
+            self._evict(keep=path)
+        return {'parameters': content, 'execution_time': execution_time, 'cache': cache, 'tree': tree}
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _hit(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        self.hit_bytes += os.path.getsize(path)
+        return True
+
+    def _store(self, path, write):
+        # Written under a temporary name and renamed, so readers never see a partial entry
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.stored_bytes += os.path.getsize(path)
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.endswith(ENTRY_SUFFIXES):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self, keep=None):
+        # Least recently used first; the new entry goes last, and only if it alone is too
+        # big (a mapping of it stays valid after the unlink)
+        entries = sorted(self._entries(), key=lambda entry: (entry[2] == keep, entry[0]))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+            self.evicted_bytes += size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_bytes': self.hit_bytes,
+            'stored_bytes': self.stored_bytes,
+            'evictions': self.evictions,
+            'evicted_bytes': self.evicted_bytes,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
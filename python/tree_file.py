@@ -0,0 +1,149 @@
+import json
+import struct
+import numpy as np
+from shared_output import ROW_BYTES
+
+# File layout, all little-endian:
+#   fixed prefix   MAGIC, format version (uint32), JSON header length (uint32), data offset (uint64)
+#   JSON header    parameters, row count, depth_offsets, column names
+#   padding        up to data offset, a multiple of DATA_ALIGNMENT
+#   row data       (count, 5) float64 rows (x1, y1, x2, y2, depth)
+#
+# Rows are stored depth-major: depth_offsets[k]:depth_offsets[k + 1] are the rows of
+# depth k, left to right. For a symmetric tree split at a fixed depth that is exactly
+# heap order (see implicit_layout.HeapBranches). With grain-bounded tasks, the upper
+# rows of a depth come before the task rows of that depth. The instanced engines emit
+# rows copy by copy rather than left to right, so they cannot write tree files.
+MAGIC = b'FRACTREE'
+FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+COLUMNS = ('x1', 'y1', 'x2', 'y2', 'depth')
+
+_PREFIX = struct.Struct('<8sIIQ')
+_ROW_DTYPE = np.dtype('<f8')
+
+
+def plan_levels(upper_depths, task_depth_counts):
+    """Place rows depth-major.
+
+    upper_depths: depth of every upper row. task_depth_counts: per task, its branch
+    count per absolute depth (index = depth). Returns depth_offsets (n_levels + 1,)
+    and, per task, the first row of its slice at every depth it covers.
+    """
+    upper_counts = np.bincount(np.asarray(upper_depths, dtype=np.intp))
+    n_levels = max([len(upper_counts)] + [len(counts) for counts in task_depth_counts])
+    level_counts = np.zeros(n_levels, dtype=np.int64)
+    level_counts[:len(upper_counts)] += upper_counts
+    for counts in task_depth_counts:
+        level_counts[:len(counts)] += counts
+    depth_offsets = np.concatenate([[0], np.cumsum(level_counts)])
+
+    # Upper rows open every level, then each task's rows follow in task order
+    cursor = depth_offsets[:-1].copy()
+    cursor[:len(upper_counts)] += upper_counts
+    task_level_offsets = []
+    for counts in task_depth_counts:
+        task_level_offsets.append(cursor[:len(counts)].copy())
+        cursor[:len(counts)] += counts
+    return depth_offsets, task_level_offsets
+
+
+def create_tree_file(path, depth_offsets, parameters=None):
+    """Write the header of a tree file and size it for its rows; returns the data offset.
+    The rows themselves are left for write_levels / the workers."""
+    depth_offsets = [int(offset) for offset in depth_offsets]
+    count = depth_offsets[-1] if depth_offsets else 0
+    header = json.dumps({
+        'parameters': parameters or {},
+        'count': count,
+        'depth_offsets': depth_offsets,
+        'columns': list(COLUMNS),
+    }).encode('utf-8')
+    data_offset = -(-(_PREFIX.size + len(header)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    with open(path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header), data_offset))
+        f.write(header)
+        f.truncate(data_offset + count * ROW_BYTES)
+    return data_offset
+
+
+def map_rows(path, data_offset, count, mode='r'):
+    """The (count, 5) row data of a tree file as a np.memmap."""
+    if count == 0:
+        return np.empty((0, 5), dtype=_ROW_DTYPE)
+    return np.memmap(path, dtype=_ROW_DTYPE, mode=mode, offset=data_offset, shape=(count, 5))
+
+
+def write_levels(rows, level_offsets, out):
+    """Write rows, stable-sorted by depth, into `out` at level_offsets[depth] per depth."""
+    depths = rows[:, 4].astype(np.intp)
+    order = np.argsort(depths, kind='stable')
+    counts = np.bincount(depths, minlength=len(level_offsets))
+    start = 0
+    for depth in range(len(counts)):
+        n = counts[depth]
+        if n > 0:
+            out[level_offsets[depth]:level_offsets[depth] + n] = rows[order[start:start + n]]
+            start += n
+    return len(rows)
+
+
+def write_file_rows(path, data_offset, count, level_offsets, rows):
+    """Map the file's rows and write `rows` depth-major at level_offsets."""
+    out = map_rows(path, data_offset, count, mode='r+')
+    try:
+        return write_levels(rows, level_offsets, out)
+    finally:
+        if isinstance(out, np.memmap):
+            out.flush()
+
+
+def write_tree(path, branches, parameters=None):
+    """Write in-memory (N, 5) rows as a tree file."""
+    depth_offsets, _ = plan_levels(branches[:, 4], [])
+    data_offset = create_tree_file(path, depth_offsets, parameters)
+    write_file_rows(path, data_offset, len(branches), depth_offsets[:-1], branches)
+    return depth_offsets
+
+
+# Read side: the header is parsed on open, the rows are a read-only np.memmap that the
+# OS pages in on demand, so opening a 100M-branch file costs the same as a small one.
+class TreeFile:
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, header_length, data_offset = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a tree file: {path}")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"Unsupported tree file version {version} (newest known: {FORMAT_VERSION})")
+            header = json.loads(f.read(header_length).decode('utf-8'))
+        self.path = path
+        self.version = version
+        self.parameters = header['parameters']
+        self.depth_offsets = header['depth_offsets']
+        self.branches = map_rows(path, data_offset, header['count'])
+
+    def __len__(self):
+        return len(self.branches)
+
+    @property
+    def max_depth(self):
+        return max(len(self.depth_offsets) - 2, 0)
+
+    def level(self, depth):
+        """Rows of one depth, as a view into the mapping."""
+        return self.branches[self.depth_offsets[depth]:self.depth_offsets[depth + 1]]
+
+    def close(self):
+        self.branches = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_tree(path):
+    return TreeFile(path)
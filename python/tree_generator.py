@@ -0,0 +1,112 @@
+import math
+import time
+from multiprocessing import Pool, Semaphore, cpu_count, resource_tracker
+from symmetric_parallel import run_parallel
+from asymmetric_parallel import run_parallel_asymmetric
+
+
+def _warm_worker():
+    # Import the engines and run each one once on a tiny tree, so the first real
+    # task does not pay for module import or first-call numpy setup.
+    from symmetric_sequential import ENGINES as SYMMETRIC_ENGINES
+    from asymmetric_sequential import ENGINES as ASYMMETRIC_ENGINES
+    for generate in SYMMETRIC_ENGINES.values():
+        generate(0, 0, 1.0, math.pi / 2, 0.5, 0.5, 0.2)
+    for generate in ASYMMETRIC_ENGINES.values():
+        generate(0, 0, 1.0, math.pi / 2, 0.5, 0.4, 0.6, 0.4, 0.2)
+
+
+def _start_worker(ready, warm):
+    if warm:
+        _warm_worker()
+    # One release per worker; the parent takes num_processes of them before it stops
+    # the startup clock. Replacement workers only leave extra releases behind.
+    ready.release()
+
+
+# Long-lived generator that owns one warm multiprocessing.Pool and serves many
+# generation requests with it, instead of spawning a pool per run_parallel* call.
+#
+#     with FractalTreeGenerator(num_processes=8) as generator:
+#         for depth in range(1, 13):
+#             generator.run_parallel_asymmetric(min_length=0.01, split_depth=depth)
+#     print(generator.stats())
+#
+# Pool startup and lifetime are timed separately from the generation time of the
+# individual requests.
+class FractalTreeGenerator:
+
+    def __init__(self, num_processes=None, warm=True):
+        self.num_processes = num_processes if num_processes is not None else cpu_count()
+        self.warm = warm
+        self.pool = None
+        self.startup_time = 0.0
+        self.compute_time = 0.0
+        self.generations = 0
+        self._opened_at = None
+        self._closed_at = None
+
+    def start(self):
+        if self.pool is not None:
+            return self
+        self._opened_at = time.perf_counter()
+        # Workers must inherit the parent's resource tracker, or each one starts its own
+        # and reports shared-output blocks as leaked when it exits
+        resource_tracker.ensure_running()
+        ready = Semaphore(0)
+        self.pool = Pool(processes=self.num_processes, initializer=_start_worker, initargs=(ready, self.warm))
+        # Block until every worker is up and has run its initializer; a pool.map would
+        # return as soon as the first workers to start had drained it
+        for _ in range(self.num_processes):
+            ready.acquire()
+        self.startup_time = time.perf_counter() - self._opened_at
+        self._closed_at = None
+        return self
+
+    def close(self):
+        if self.pool is None:
+            return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+        self._closed_at = time.perf_counter()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run_parallel(self, **kwargs):
+        return self._record(run_parallel(**self._pool_kwargs(kwargs)))
+
+    def run_parallel_asymmetric(self, **kwargs):
+        return self._record(run_parallel_asymmetric(**self._pool_kwargs(kwargs)))
+
+    def _pool_kwargs(self, kwargs):
+        # The pool is this generator's, so its size is not a per-request choice
+        num_processes = kwargs.pop('num_processes', None)
+        if num_processes is not None and num_processes != self.num_processes:
+            raise ValueError(f"This generator's pool has {self.num_processes} processes; "
+                             f"create a FractalTreeGenerator(num_processes={num_processes}) instead")
+        if 'pool' in kwargs:
+            raise ValueError("FractalTreeGenerator runs on its own pool; pass no pool")
+        return {**kwargs, 'num_processes': self.num_processes, 'pool': self.start().pool}
+
+    def _record(self, result):
+        self.compute_time += result['execution_time']
+        self.generations += 1
+        return result
+
+    def stats(self):
+        if self._opened_at is None:
+            lifetime = 0.0
+        else:
+            lifetime = (self._closed_at or time.perf_counter()) - self._opened_at
+        return {
+            'num_processes': self.num_processes,
+            'generations': self.generations,
+            'pool_startup_time': self.startup_time,
+            'pool_lifetime': lifetime,
+            'compute_time': self.compute_time,
+        }
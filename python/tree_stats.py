@@ -0,0 +1,109 @@
+import math
+from math import comb
+import numpy as np
+from asymmetric_sequential import _lattice_lengths
+from culling import effective_min_length
+from shared_output import ROW_BYTES
+
+
+# Analytic statistics of a whole tree, computed on the (left_turns, right_turns)
+# lattice instead of generating it. A branch reached by a left and b right turns has
+# length L * left_ratio^a * right_ratio^b and direction pi/2 + a * left_angle
+# - b * right_angle, whatever the order of the turns, and C(a + b, a) branches share
+# every cell. All subtrees rooted in the same cell are therefore translated copies of
+# one another, so each cell's extent relative to its start point follows from its two
+# children, and the exact bounding box falls out of one sweep. Everything runs in
+# O(D_left x D_right); the symmetric tree is the case of equal ratios and angles.
+#
+# Keys match TreeSummary.as_dict(), plus the leaf count and the size of the (N, 5) rows.
+def _lattice_stats(lengths, left_angle_rad, right_angle_rad, min_length, angle=math.pi / 2):
+    n_left, n_right = lengths.shape
+    valid = lambda a, b: a < n_left and b < n_right and lengths[a, b] >= min_length
+
+    count = 0
+    leaves = 0
+    total_length = 0.0
+    depth_counts = []
+    depth_lengths = []
+    # (min_x, min_y, max_x, max_y) of each cell's subtree relative to its start point
+    extent = {}
+
+    for a in range(n_left - 1, -1, -1):
+        for b in range(n_right - 1, -1, -1):
+            if not valid(a, b):
+                continue
+            length = float(lengths[a, b])
+            direction = angle + a * left_angle_rad - b * right_angle_rad
+            end_x = length * math.cos(direction)
+            end_y = length * math.sin(direction)
+
+            min_x, min_y = min(0.0, end_x), min(0.0, end_y)
+            max_x, max_y = max(0.0, end_x), max(0.0, end_y)
+            children = [cell for cell in ((a + 1, b), (a, b + 1)) if valid(*cell)]
+            for child in children:
+                child_min_x, child_min_y, child_max_x, child_max_y = extent[child]
+                min_x, min_y = min(min_x, end_x + child_min_x), min(min_y, end_y + child_min_y)
+                max_x, max_y = max(max_x, end_x + child_max_x), max(max_y, end_y + child_max_y)
+            extent[a, b] = (min_x, min_y, max_x, max_y)
+
+            paths = comb(a + b, a)
+            depth = a + b
+            while len(depth_counts) <= depth:
+                depth_counts.append(0)
+                depth_lengths.append(0.0)
+            depth_counts[depth] += paths
+            depth_lengths[depth] += paths * length
+            count += paths
+            total_length += paths * length
+            if not children:
+                leaves += paths
+
+    return {
+        'count': count,
+        'max_depth': len(depth_counts) - 1 if count > 0 else 0,
+        'bbox': extent.get((0, 0)),
+        'total_length': total_length,
+        'depth_counts': depth_counts,
+        'depth_lengths': depth_lengths,
+        'leaves': leaves,
+        'nbytes': count * ROW_BYTES,
+    }
+
+
+def tree_stats_symmetric(trunk_length=100.0, ratio=0.67, branch_angle=30.0, min_length=0.01):
+    # Lengths by repeated multiplication per depth, exactly as the symmetric generators
+    level_lengths = []
+    length = trunk_length
+    while length >= min_length:
+        level_lengths.append(length)
+        length *= ratio
+    level_lengths.append(length)
+
+    # A symmetric cell's length depends on its depth only
+    level_lengths = np.array(level_lengths)
+    n = len(level_lengths)
+    depths = np.add.outer(np.arange(n), np.arange(n))
+    lengths = np.where(depths < n, level_lengths[np.minimum(depths, n - 1)], 0.0)
+    branch_angle_rad = math.radians(branch_angle)
+    return _lattice_stats(lengths, branch_angle_rad, branch_angle_rad, min_length)
+
+
+def tree_stats_asymmetric(trunk_length=100.0, left_ratio=0.67, right_ratio=0.57,
+                          left_angle=35.0, right_angle=25.0, min_length=0.01):
+    # Same lattice lengths as _count_asymmetric, so the count matches the preallocation
+    lengths = _lattice_lengths(trunk_length, left_ratio, right_ratio, min_length)
+    return _lattice_stats(lengths, math.radians(left_angle), math.radians(right_angle), min_length)
+
+
+def tree_stats(params):
+    """Analytic stats for a parameter dict shaped like result['parameters'] of the run_*
+    functions; 'left_ratio' selects the asymmetric tree. A pixel_size raises min_length
+    as it does for generation; a bbox is ignored, the stats cover the whole tree."""
+    min_length = effective_min_length(params.get('min_length', 0.01), params.get('pixel_size'))
+    if 'left_ratio' in params:
+        return tree_stats_asymmetric(params.get('trunk_length', 100.0), params['left_ratio'],
+                                     params.get('right_ratio', 0.57), params.get('left_angle', 35.0),
+                                     params.get('right_angle', 25.0), min_length)
+    return tree_stats_symmetric(params.get('trunk_length', 100.0), params.get('ratio', 0.67),
+                                params.get('branch_angle', 30.0), min_length)
+
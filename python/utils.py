@@ -15,3 +15,10 @@ def print_result(execution_time, num_branches, max_depth):
 
     print(f"Generation time: {execution_time:.6f}s")
     print(f"Branches: {num_branches:,} | Max depth: {max_depth}")
+
+
+def print_task_histogram(histogram):
+
+    print("Task sizes (branches):")
+    for bucket, count in histogram.items():
+        print(f"  >= {bucket:>12,} : {count:,}")